@@ -5,6 +5,8 @@ Development script for MCP Verilog Server
 
 import os
 import sys
+import shutil
+import hashlib
 import subprocess
 import logging
 from pathlib import Path
@@ -16,14 +18,32 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Files whose contents determine the installed dependency set
+DEPENDENCY_FILES = ("pyproject.toml", "uv.lock", "poetry.lock")
+
+def dependency_hash():
+    """Hash the dependency inputs that exist in the project root"""
+    digest = hashlib.sha256()
+    for name in DEPENDENCY_FILES:
+        path = Path(name)
+        if path.exists():
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
 def setup_environment():
     """Set up the development environment"""
     try:
+        # Prefer uv for venv creation and installs when it is available
+        uv_path = shutil.which("uv")
+        
         # Create virtual environment if it doesn't exist
         venv_path = Path(".venv")
         if not venv_path.exists():
             logger.info("Creating virtual environment...")
-            subprocess.run([sys.executable, "-m", "venv", ".venv"], check=True)
+            if uv_path:
+                subprocess.run([uv_path, "venv", ".venv"], check=True)
+            else:
+                subprocess.run([sys.executable, "-m", "venv", ".venv"], check=True)
         
         # Get the Python executable from the virtual environment
         if sys.platform == "win32":
@@ -31,13 +51,33 @@ def setup_environment():
         else:
             python_path = venv_path / "bin" / "python"
         
-        # Install dependencies
-        logger.info("Installing dependencies...")
-        subprocess.run([str(python_path), "-m", "pip", "install", "-e", ".[dev]"], check=True)
+        # Skip the install when dependencies haven't changed since the last one
+        stamp_file = venv_path / ".deps.sha256"
+        deps_hash = dependency_hash()
+        if (
+            python_path.exists()
+            and stamp_file.exists()
+            and stamp_file.read_text().strip() == deps_hash
+        ):
+            logger.info("Dependencies are up to date, skipping install")
+        elif uv_path:
+            logger.info("Installing dependencies...")
+            subprocess.run(
+                [uv_path, "pip", "install", "-e", ".[dev]", "--python", str(python_path)],
+                check=True
+            )
+        else:
+            logger.info("Installing dependencies...")
+            subprocess.run(
+                [str(python_path), "-m", "pip", "install", "-e", ".[dev]",
+                 "--prefer-binary", "--no-compile"],
+                check=True
+            )
+        stamp_file.write_text(deps_hash)
         
         # Create necessary directories
-        Path("mcp_output").mkdir(exist_ok=True)
-        Path("logs").mkdir(exist_ok=True)
+        for directory in ("mcp_output", "logs"):
+            os.makedirs(directory, exist_ok=True)
         
         return python_path
         
@@ -54,10 +94,8 @@ def run_server(python_path):
         logger.info("Starting MCP server...")
         server_script = Path("src") / "mcp_server.py"
         
-        # Set environment variables
-        env = os.environ.copy()
-        env["PYTHONPATH"] = str(Path.cwd())
-        env["LOG_LEVEL"] = "DEBUG"
+        # Set environment variables for the server process only
+        env = {**os.environ, "PYTHONPATH": str(Path.cwd()), "LOG_LEVEL": "DEBUG"}
         
         # Run the server
         subprocess.run(
@@ -31,14 +31,29 @@ def create_directories():
         "test_output"
     ]
     
-    for directory in directories:
-        Path(directory).mkdir(parents=True, exist_ok=True)
-        logger.info(f"Created directory: {directory}")
+    # Only leaf directories need creating; makedirs brings their ancestors along
+    leaves = []
+    for directory in sorted(directories, key=lambda d: d.count("/"), reverse=True):
+        if not any(leaf.startswith(directory + "/") for leaf in leaves):
+            leaves.append(directory)
+    
+    for directory in leaves:
+        os.makedirs(directory, exist_ok=True)
+    logger.info(f"Created directories: {', '.join(directories)}")
+
+def move_file(file, dest):
+    """Move a file into dest, renaming in place when both are on the same device"""
+    target = Path(dest) / file
+    if os.stat(file).st_dev == os.stat(dest).st_dev:
+        os.replace(file, target)
+    else:
+        shutil.move(file, target)
+    logger.info(f"Moved {file} to {dest}")
 
 def move_files():
     """Move files to their correct locations"""
-    # Move Python files to src/mcp_verilog
-    src_files = {
+    destinations = {
+        # Python files to src/mcp_verilog
         "verilog_ai_agent.py": "src/mcp_verilog/agents/",
         "verilog_generator.py": "src/mcp_verilog/tools/",
         "design_optimizer.py": "src/mcp_verilog/tools/",
@@ -47,15 +62,7 @@ def move_files():
         "code_quality_analyzer.py": "src/mcp_verilog/tools/",
         "mcp_server.py": "src/mcp_verilog/",
         "mcp_client.py": "src/mcp_verilog/",
-    }
-    
-    for file, dest in src_files.items():
-        if Path(file).exists():
-            shutil.move(file, Path(dest) / file)
-            logger.info(f"Moved {file} to {dest}")
-    
-    # Move test files to tests
-    test_files = {
+        # Test files to tests
         "test_mcp_server.py": "tests/integration/",
         "test_examples.py": "tests/unit/",
         "test_mcp_verilog.py": "tests/integration/",
@@ -64,15 +71,16 @@ def move_files():
         "test_risc_processor.py": "tests/unit/",
     }
     
-    for file, dest in test_files.items():
-        if Path(file).exists():
-            shutil.move(file, Path(dest) / file)
-            logger.info(f"Moved {file} to {dest}")
-    
-    # Move log files to logs
-    for log_file in Path(".").glob("*.log"):
-        shutil.move(str(log_file), Path("logs") / log_file.name)
-        logger.info(f"Moved {log_file.name} to logs/")
+    # Single pass over the project root; log files go to logs
+    with os.scandir(".") as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            dest = destinations.get(entry.name)
+            if dest is None and entry.name.endswith(".log"):
+                dest = "logs/"
+            if dest is not None:
+                move_file(entry.name, dest)
 
 def create_init_files():
     """Create __init__.py files"""
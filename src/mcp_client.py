@@ -1,342 +1,342 @@
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 import asyncio
+import atexit
 import json
+import os
+import queue
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from contextvars import ContextVar
 from pathlib import Path
 import logging
+from logging.handlers import QueueHandler, QueueListener
 import traceback
-from datetime import datetime
 import sys
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, Optional
 
-# Configure logging
+# Configure logging; DEBUG output is opt-in via LOG_LEVEL=DEBUG and records
+# are written by a background listener thread
+log_handlers = [
+    logging.FileHandler('mcp_client_debug.log', delay=True),
+    logging.StreamHandler(sys.stdout)
+]
+for handler in log_handlers:
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, *log_handlers)
+log_listener.start()
+atexit.register(log_listener.stop)
 logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('mcp_client_debug.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
+    level=getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO),
+    format='%(message)s',
+    handlers=[QueueHandler(log_queue)]
 )
 logger = logging.getLogger(__name__)
 
 # Add debug logging decorator
 def debug_log(func):
     async def wrapper(*args, **kwargs):
-        start_time = datetime.now()
-        logger.debug(f"Starting {func.__name__} with args: {args}, kwargs: {kwargs}")
+        start_time = time.perf_counter()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Starting %s with args: %s, kwargs: %s", func.__name__, args, kwargs)
         
         try:
             result = await func(*args, **kwargs)
-            end_time = datetime.now()
-            duration = (end_time - start_time).total_seconds()
-            logger.debug(f"Completed {func.__name__} in {duration:.2f} seconds")
+            duration = time.perf_counter() - start_time
+            logger.debug("Completed %s in %.2f seconds", func.__name__, duration)
             return result
         except Exception as e:
-            end_time = datetime.now()
-            duration = (end_time - start_time).total_seconds()
+            duration = time.perf_counter() - start_time
             logger.error(f"Error in {func.__name__} after {duration:.2f} seconds: {str(e)}")
             logger.error(traceback.format_exc())
             raise
     
     return wrapper
 
-@debug_log
-async def analyze_syntax(verilog_code: str) -> Dict[str, Any]:
-    """Analyze Verilog code for syntax errors"""
-    server_params = StdioServerParameters(
-        command="python",
-        args=["mcp_server.py"],
-        env=None,
-    )
+# Interpreter and server parameters backing the client helpers
+PYTHON = sys.executable
+ANALYSIS_SERVER = StdioServerParameters(
+    command=PYTHON,
+    args=[str(Path(__file__).parent / "mcp_server.py")],
+    env=None,
+)
+AGENT_SERVER = StdioServerParameters(
+    command=PYTHON,
+    args=[str(Path(__file__).parent / "mcp_verilog_agent.py")],
+    env=None,
+)
+
+# Sessions opened by mcp_sessions(), seen by the task that entered it and by
+# every task it spawns. The SDK lists a server's tools on the first call_tool
+# and keeps the catalog for the session, so tool discovery also happens once
+# per server per block
+_active_sessions: ContextVar[Optional[Dict[int, ClientSession]]] = ContextVar("_active_sessions", default=None)
+
+@asynccontextmanager
+async def mcp_sessions(*servers: StdioServerParameters) -> AsyncIterator[Dict[int, ClientSession]]:
+    """Keep one session per server open for the duration of the block
+    
+    Enter it in the top-level task: the servers are spawned on entry and shut
+    down on exit by that same task, and the client helpers called inside the
+    block, including from tasks it gathers, reuse these sessions. With no
+    servers given, both the analysis and the agent server are opened.
+    """
+    async with AsyncExitStack() as stack:
+        sessions = {}
+        for server_params in servers or (ANALYSIS_SERVER, AGENT_SERVER):
+            read, write = await stack.enter_async_context(stdio_client(server_params))
+            session = await stack.enter_async_context(ClientSession(read, write))
+            await session.initialize()
+            sessions[id(server_params)] = session
+            logger.debug("Started MCP session for %s", server_params.args)
+        
+        token = _active_sessions.set(sessions)
+        try:
+            yield sessions
+        finally:
+            _active_sessions.reset(token)
 
+@asynccontextmanager
+async def open_session(server_params: StdioServerParameters) -> AsyncIterator[ClientSession]:
+    """Yield the server's session from mcp_sessions(), or a session for this block only
+    
+    A session opened here is shared the same way for the rest of the block,
+    so helpers called or gathered inside it reuse it.
+    """
+    sessions = _active_sessions.get()
+    if sessions is not None and id(server_params) in sessions:
+        yield sessions[id(server_params)]
+        return
+    
     async with stdio_client(server_params) as (read, write):
         async with ClientSession(read, write) as session:
+            await session.initialize()
+            token = _active_sessions.set({**(sessions or {}), id(server_params): session})
             try:
-                await session.initialize()
-                result = await session.call_tool(
-                    "analyze_syntax",
-                    arguments={"verilog_code": verilog_code}
-                )
-                return result
-            except Exception as e:
-                logger.error(f"Syntax analysis failed: {str(e)}")
-                raise
+                yield session
+            finally:
+                _active_sessions.reset(token)
+
+@debug_log
+async def analyze_syntax(verilog_code: str) -> Dict[str, Any]:
+    """Analyze Verilog code for syntax errors"""
+    async with open_session(ANALYSIS_SERVER) as session:
+        try:
+            result = await session.call_tool(
+                "analyze_syntax",
+                arguments={"verilog_code": verilog_code}
+            )
+            return result
+        except Exception as e:
+            logger.error(f"Syntax analysis failed: {str(e)}")
+            raise
 
 @debug_log
 async def analyze_simulation(verilog_code: str, testbench: str) -> Dict[str, Any]:
     """Analyze simulation behavior"""
-    server_params = StdioServerParameters(
-        command="python",
-        args=["mcp_server.py"],
-        env=None,
-    )
-
-    async with stdio_client(server_params) as (read, write):
-        async with ClientSession(read, write) as session:
-            try:
-                await session.initialize()
-                result = await session.call_tool(
-                    "analyze_simulation",
-                    arguments={
-                        "verilog_code": verilog_code,
-                        "testbench": testbench
-                    }
-                )
-                return result
-            except Exception as e:
-                logger.error(f"Simulation analysis failed: {str(e)}")
-                raise
+    async with open_session(ANALYSIS_SERVER) as session:
+        try:
+            result = await session.call_tool(
+                "analyze_simulation",
+                arguments={
+                    "verilog_code": verilog_code,
+                    "testbench": testbench
+                }
+            )
+            return result
+        except Exception as e:
+            logger.error(f"Simulation analysis failed: {str(e)}")
+            raise
 
 @debug_log
 async def analyze_synthesis(verilog_code: str) -> Dict[str, Any]:
     """Analyze synthesis issues"""
-    server_params = StdioServerParameters(
-        command="python",
-        args=["mcp_server.py"],
-        env=None,
-    )
-
-    async with stdio_client(server_params) as (read, write):
-        async with ClientSession(read, write) as session:
-            try:
-                await session.initialize()
-                result = await session.call_tool(
-                    "analyze_synthesis",
-                    arguments={"verilog_code": verilog_code}
-                )
-                return result
-            except Exception as e:
-                logger.error(f"Synthesis analysis failed: {str(e)}")
-                raise
+    async with open_session(ANALYSIS_SERVER) as session:
+        try:
+            result = await session.call_tool(
+                "analyze_synthesis",
+                arguments={"verilog_code": verilog_code}
+            )
+            return result
+        except Exception as e:
+            logger.error(f"Synthesis analysis failed: {str(e)}")
+            raise
 
 @debug_log
 async def analyze_formal_verification(verilog_code: str) -> Dict[str, Any]:
     """Analyze formal verification issues"""
-    server_params = StdioServerParameters(
-        command="python",
-        args=["mcp_server.py"],
-        env=None,
-    )
-
-    async with stdio_client(server_params) as (read, write):
-        async with ClientSession(read, write) as session:
-            try:
-                await session.initialize()
-                result = await session.call_tool(
-                    "analyze_formal_verification",
-                    arguments={"verilog_code": verilog_code}
-                )
-                return result
-            except Exception as e:
-                logger.error(f"Formal verification analysis failed: {str(e)}")
-                raise
+    async with open_session(ANALYSIS_SERVER) as session:
+        try:
+            result = await session.call_tool(
+                "analyze_formal_verification",
+                arguments={"verilog_code": verilog_code}
+            )
+            return result
+        except Exception as e:
+            logger.error(f"Formal verification analysis failed: {str(e)}")
+            raise
 
 @debug_log
 async def debug_design(verilog_code: str, error_message: str, context: str = "") -> Dict[str, Any]:
     """Enhanced debugging function"""
-    server_params = StdioServerParameters(
-        command="python",
-        args=["mcp_server.py"],
-        env=None,
-    )
-
-    async with stdio_client(server_params) as (read, write):
-        async with ClientSession(read, write) as session:
-            try:
-                await session.initialize()
-                
-                # Get debug prompt
-                prompt = await session.get_prompt(
-                    "debug_prompt",
-                    arguments={
-                        "verilog_code": verilog_code,
-                        "error_message": error_message,
-                        "context": context
-                    }
-                )
-                
-                # Perform comprehensive analysis
-                syntax_result = await analyze_syntax(verilog_code)
-                synthesis_result = await analyze_synthesis(verilog_code)
-                formal_result = await analyze_formal_verification(verilog_code)
-                
-                return {
-                    "debug_prompt": prompt,
-                    "syntax_analysis": syntax_result,
-                    "synthesis_analysis": synthesis_result,
-                    "formal_verification": formal_result
+    async with open_session(ANALYSIS_SERVER) as session:
+        try:
+            # Get debug prompt
+            prompt = await session.get_prompt(
+                "debug_prompt",
+                arguments={
+                    "verilog_code": verilog_code,
+                    "error_message": error_message,
+                    "context": context
                 }
-                
-            except Exception as e:
-                logger.error(f"Debugging failed: {str(e)}")
-                raise
+            )
+
+            # Perform comprehensive analysis concurrently over the same session
+            syntax_result, synthesis_result, formal_result = await asyncio.gather(
+                analyze_syntax(verilog_code),
+                analyze_synthesis(verilog_code),
+                analyze_formal_verification(verilog_code)
+            )
+
+            return {
+                "debug_prompt": prompt,
+                "syntax_analysis": syntax_result,
+                "synthesis_analysis": synthesis_result,
+                "formal_verification": formal_result
+            }
+
+        except Exception as e:
+            logger.error(f"Debugging failed: {str(e)}")
+            raise
 
 @debug_log
 async def generate_verilog_design(description: str, module_name: Optional[str] = None) -> Dict[str, Any]:
     """Generate a complete Verilog design using the AI Agent"""
-    server_params = StdioServerParameters(
-        command="python",
-        args=["mcp_verilog_agent.py"],
-        env=None,
-    )
-
-    async with stdio_client(server_params) as (read, write):
-        async with ClientSession(read, write) as session:
-            try:
-                await session.initialize()
-                result = await session.call_tool(
-                    "generate_design",
-                    arguments={
-                        "description": description,
-                        "module_name": module_name
-                    }
-                )
-                return result
-            except Exception as e:
-                logger.error(f"Design generation failed: {str(e)}")
-                raise
+    async with open_session(AGENT_SERVER) as session:
+        try:
+            result = await session.call_tool(
+                "generate_design",
+                arguments={
+                    "description": description,
+                    "module_name": module_name
+                }
+            )
+            return result
+        except Exception as e:
+            logger.error(f"Design generation failed: {str(e)}")
+            raise
 
 @debug_log
 async def optimize_design(verilog_code: str) -> Dict[str, Any]:
     """Optimize a Verilog design"""
-    server_params = StdioServerParameters(
-        command="python",
-        args=["mcp_verilog_agent.py"],
-        env=None,
-    )
-
-    async with stdio_client(server_params) as (read, write):
-        async with ClientSession(read, write) as session:
-            try:
-                await session.initialize()
-                result = await session.call_tool(
-                    "optimize_design",
-                    arguments={"verilog_code": verilog_code}
-                )
-                return result
-            except Exception as e:
-                logger.error(f"Design optimization failed: {str(e)}")
-                raise
+    async with open_session(AGENT_SERVER) as session:
+        try:
+            result = await session.call_tool(
+                "optimize_design",
+                arguments={"verilog_code": verilog_code}
+            )
+            return result
+        except Exception as e:
+            logger.error(f"Design optimization failed: {str(e)}")
+            raise
 
 @debug_log
 async def verify_design(verilog_code: str, testbench: str) -> Dict[str, Any]:
     """Verify a Verilog design"""
-    server_params = StdioServerParameters(
-        command="python",
-        args=["mcp_verilog_agent.py"],
-        env=None,
-    )
-
-    async with stdio_client(server_params) as (read, write):
-        async with ClientSession(read, write) as session:
-            try:
-                await session.initialize()
-                result = await session.call_tool(
-                    "verify_design",
-                    arguments={
-                        "verilog_code": verilog_code,
-                        "testbench": testbench
-                    }
-                )
-                return result
-            except Exception as e:
-                logger.error(f"Design verification failed: {str(e)}")
-                raise
+    async with open_session(AGENT_SERVER) as session:
+        try:
+            result = await session.call_tool(
+                "verify_design",
+                arguments={
+                    "verilog_code": verilog_code,
+                    "testbench": testbench
+                }
+            )
+            return result
+        except Exception as e:
+            logger.error(f"Design verification failed: {str(e)}")
+            raise
 
 @debug_log
 async def generate_documentation(verilog_code: str, testbench: str) -> Dict[str, Any]:
     """Generate documentation for a Verilog design"""
-    server_params = StdioServerParameters(
-        command="python",
-        args=["mcp_verilog_agent.py"],
-        env=None,
-    )
-
-    async with stdio_client(server_params) as (read, write):
-        async with ClientSession(read, write) as session:
-            try:
-                await session.initialize()
-                result = await session.call_tool(
-                    "generate_documentation",
-                    arguments={
-                        "verilog_code": verilog_code,
-                        "testbench": testbench
-                    }
-                )
-                return result
-            except Exception as e:
-                logger.error(f"Documentation generation failed: {str(e)}")
-                raise
+    async with open_session(AGENT_SERVER) as session:
+        try:
+            result = await session.call_tool(
+                "generate_documentation",
+                arguments={
+                    "verilog_code": verilog_code,
+                    "testbench": testbench
+                }
+            )
+            return result
+        except Exception as e:
+            logger.error(f"Documentation generation failed: {str(e)}")
+            raise
 
 @debug_log
 async def get_design(design_id: str) -> Dict[str, Any]:
     """Retrieve a previously generated design"""
-    server_params = StdioServerParameters(
-        command="python",
-        args=["mcp_verilog_agent.py"],
-        env=None,
-    )
-
-    async with stdio_client(server_params) as (read, write):
-        async with ClientSession(read, write) as session:
-            try:
-                await session.initialize()
-                result = await session.call_tool(
-                    "get_design",
-                    arguments={"design_id": design_id}
-                )
-                return result
-            except Exception as e:
-                logger.error(f"Failed to retrieve design: {str(e)}")
-                raise
+    async with open_session(AGENT_SERVER) as session:
+        try:
+            result = await session.call_tool(
+                "get_design",
+                arguments={"design_id": design_id}
+            )
+            return result
+        except Exception as e:
+            logger.error(f"Failed to retrieve design: {str(e)}")
+            raise
 
 async def main():
     """Main entry point for the MCP client"""
-    try:
-        # Example: Generate a RISC processor design
-        description = """
-        Design a 5-stage pipelined RISC processor core with the following specifications:
-        - 32-bit instruction set
-        - 32-bit data path
-        - 32 general-purpose registers
-        - 4KB instruction cache
-        - 4KB data cache
-        - Branch prediction
-        - Forwarding unit
-        - Hazard detection
-        """
-        
-        # Generate the design
-        design_result = await generate_verilog_design(description, "risc_processor")
-        logger.info("Design generated successfully!")
-        
-        # Get the generated files
-        design_id = design_result["files"]["original"]["verilog"].stem
-        design_files = await get_design(design_id)
-        logger.info(f"Retrieved design files: {list(design_files['files'].keys())}")
-        
-        # Optimize the design
-        optimization_result = await optimize_design(design_files["files"]["risc_processor.v"])
-        logger.info("Design optimized successfully!")
-        
-        # Verify the design
-        verification_result = await verify_design(
-            optimization_result["optimized_file"],
-            design_files["files"]["risc_processor_tb.sv"]
-        )
-        logger.info("Design verified successfully!")
-        
-        # Generate documentation
-        doc_result = await generate_documentation(
-            optimization_result["optimized_file"],
-            design_files["files"]["risc_processor_tb.sv"]
-        )
-        logger.info("Documentation generated successfully!")
-        
-    except Exception as e:
-        logger.error(f"Error in main: {str(e)}")
-        raise
+    # One agent server session serves every call below and is closed by this task
+    async with mcp_sessions(AGENT_SERVER):
+        try:
+            # Example: Generate a RISC processor design
+            description = """
+            Design a 5-stage pipelined RISC processor core with the following specifications:
+            - 32-bit instruction set
+            - 32-bit data path
+            - 32 general-purpose registers
+            - 4KB instruction cache
+            - 4KB data cache
+            - Branch prediction
+            - Forwarding unit
+            - Hazard detection
+            """
+            
+            # Generate the design
+            design_result = await generate_verilog_design(description, "risc_processor")
+            logger.info("Design generated successfully!")
+            
+            # Get the generated files
+            design_id = design_result["files"]["original"]["verilog"].stem
+            design_files = await get_design(design_id)
+            logger.info(f"Retrieved design files: {list(design_files['files'].keys())}")
+            
+            # Optimize the design
+            optimization_result = await optimize_design(design_files["files"]["risc_processor.v"])
+            logger.info("Design optimized successfully!")
+            
+            # Verify the design
+            verification_result = await verify_design(
+                optimization_result["optimized_file"],
+                design_files["files"]["risc_processor_tb.sv"]
+            )
+            logger.info("Design verified successfully!")
+            
+            # Generate documentation
+            doc_result = await generate_documentation(
+                optimization_result["optimized_file"],
+                design_files["files"]["risc_processor_tb.sv"]
+            )
+            logger.info("Documentation generated successfully!")
+            
+        except Exception as e:
+            logger.error(f"Error in main: {str(e)}")
+            raise
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
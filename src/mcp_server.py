@@ -5,52 +5,90 @@ Provides a unified interface for Verilog design generation and analysis.
 """
 
 import asyncio
+import atexit
+import functools
+import hashlib
 import logging
+import os
+import queue
 import sys
+import uuid
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from typing import Dict, Any, Optional
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
 from mcp import Server, StdioServerParameters
 from mcp.server.stdio import stdio_server
-from verilog_ai_agent import VerilogAIAgent
 
-# Configure logging
+# Configure logging; records are written by a background listener thread
+log_handlers = [
+    logging.FileHandler('mcp_server.log', delay=True),
+    logging.StreamHandler(sys.stdout)
+]
+for handler in log_handlers:
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, *log_handlers)
+log_listener.start()
+atexit.register(log_listener.stop)
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('mcp_server.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
+    format='%(message)s',
+    handlers=[QueueHandler(log_queue)]
 )
 logger = logging.getLogger(__name__)
 
-# Initialize FastAPI app
-app = FastAPI(title="MCP Verilog Server", version="1.0.0")
-
-# Initialize Verilog AI Agent
-verilog_agent = VerilogAIAgent(output_dir="mcp_output")
-
 # Initialize MCP server
 server = Server()
 
-class DesignRequest(BaseModel):
-    """Request model for design generation"""
-    description: str
-    module_name: Optional[str] = None
-
-class DesignResponse(BaseModel):
-    """Response model for design generation"""
-    files: Dict[str, Any]
-    reports: Dict[str, Any]
+@functools.lru_cache(maxsize=None)
+def get_agent():
+    """Create the Verilog AI Agent on first use"""
+    from verilog_ai_agent import VerilogAIAgent
+    return VerilogAIAgent(output_dir="mcp_output")
+
+def request_context(verilog_code: str, testbench: Optional[str] = None):
+    """Hand posted sources to the agent in memory under a unique per-request stem
+    
+    The paths are never read; the stem only names the outputs the agent writes.
+    """
+    from verilog_scan import ToolContext
+    stem = f"temp_{uuid.uuid4().hex}"
+    return ToolContext(
+        verilog_file=Path("mcp_output") / f"{stem}.v",
+        testbench_file=Path("mcp_output") / f"{stem}_tb.sv" if testbench is not None else None,
+        verilog_content=verilog_code,
+        testbench_content=testbench
+    )
+
+def collect_outputs(results: Dict[str, Any], stem: str) -> Dict[str, Any]:
+    """Return results with each file written for the request replaced by its text
+    
+    An "optimized_file" entry becomes "optimized", and so on, so the client
+    keeps the outputs that remove_outputs deletes.
+    """
+    collected = {}
+    for key, value in results.items():
+        if isinstance(value, Path) and value.name.startswith(stem):
+            collected[key.removesuffix("_file")] = value.read_text(encoding="utf-8")
+        else:
+            collected[key] = value
+    return collected
+
+def remove_outputs(stem: str) -> None:
+    """Delete every file the agent wrote for one request"""
+    for path in Path("mcp_output").glob(f"{stem}*"):
+        path.unlink(missing_ok=True)
+
+def read_design_file(path: Path) -> str:
+    """Read a design file as UTF-8"""
+    return path.read_text(encoding="utf-8")
 
 # Register MCP tools
 @server.tool("generate_design")
 async def generate_design(description: str, module_name: Optional[str] = None) -> Dict[str, Any]:
     """Generate a complete Verilog design using the AI Agent"""
     try:
-        results = await verilog_agent.process_design(
+        results = await get_agent().process_design(
             description=description,
             module_name=module_name
         )
@@ -60,21 +98,43 @@ async def generate_design(description: str, module_name: Optional[str] = None) -
         raise
 
 @server.tool("get_design")
-async def get_design(design_id: str) -> Dict[str, Any]:
-    """Retrieve a previously generated design"""
+async def get_design(design_id: str, etag: Optional[str] = None) -> Dict[str, Any]:
+    """Retrieve a previously generated design
+    
+    Pass the etag from a previous call to skip re-reading an unchanged design.
+    """
     try:
         design_dir = Path("mcp_output") / design_id
         if not design_dir.exists():
             raise ValueError("Design not found")
         
-        # Read all relevant files
-        files = {}
-        for file_path in design_dir.glob("*"):
-            if file_path.is_file():
-                files[file_path.name] = file_path.read_text()
+        # Collect file sizes and modification times in one directory pass
+        with os.scandir(design_dir) as entries:
+            stats = {
+                entry.name: entry.stat()
+                for entry in entries if entry.is_file()
+            }
+        tag = hashlib.sha256("".join(
+            f"{name}:{st.st_mtime_ns}:{st.st_size};" for name, st in sorted(stats.items())
+        ).encode()).hexdigest()
+        
+        if etag == tag:
+            return {
+                "design_id": design_id,
+                "etag": tag,
+                "unchanged": True
+            }
+        
+        # Read all relevant files concurrently off the event loop
+        contents = await asyncio.gather(*(
+            asyncio.to_thread(read_design_file, design_dir / name)
+            for name, st in stats.items()
+        ))
+        files = dict(zip(stats, contents))
         
         return {
             "design_id": design_id,
+            "etag": tag,
             "files": files
         }
     except Exception as e:
@@ -85,17 +145,15 @@ async def get_design(design_id: str) -> Dict[str, Any]:
 async def optimize_design(verilog_code: str) -> Dict[str, Any]:
     """Optimize an existing Verilog design"""
     try:
-        # Save the code temporarily
-        temp_file = Path("mcp_output") / "temp.v"
-        temp_file.write_text(verilog_code)
-        
-        # Optimize the design
-        optimization_results = verilog_agent.optimize_design(temp_file)
-        
-        # Clean up
-        temp_file.unlink()
-        
-        return optimization_results
+        # Optimize the design straight from the posted code
+        ctx = request_context(verilog_code)
+        stem = ctx.verilog_file.stem
+        try:
+            results = await get_agent().optimize_design(ctx.verilog_file, ctx.verilog_content)
+            return await asyncio.to_thread(collect_outputs, results, stem)
+        finally:
+            # Nothing written for this request is left behind
+            await asyncio.to_thread(remove_outputs, stem)
     except Exception as e:
         logger.error(f"Design optimization failed: {str(e)}")
         raise
@@ -104,21 +162,15 @@ async def optimize_design(verilog_code: str) -> Dict[str, Any]:
 async def verify_design(verilog_code: str, testbench: str) -> Dict[str, Any]:
     """Verify a Verilog design"""
     try:
-        # Save the files temporarily
-        temp_verilog = Path("mcp_output") / "temp.v"
-        temp_tb = Path("mcp_output") / "temp_tb.sv"
-        
-        temp_verilog.write_text(verilog_code)
-        temp_tb.write_text(testbench)
-        
-        # Verify the design
-        verification_results = verilog_agent.verify_design(temp_verilog, temp_tb)
-        
-        # Clean up
-        temp_verilog.unlink()
-        temp_tb.unlink()
-        
-        return verification_results
+        # Verify the design straight from the posted sources
+        ctx = request_context(verilog_code, testbench)
+        stem = ctx.verilog_file.stem
+        try:
+            results = await get_agent().verify_design(ctx.verilog_file, ctx.testbench_file, ctx)
+            return await asyncio.to_thread(collect_outputs, results, stem)
+        finally:
+            # Nothing written for this request is left behind
+            await asyncio.to_thread(remove_outputs, stem)
     except Exception as e:
         logger.error(f"Design verification failed: {str(e)}")
         raise
@@ -127,50 +179,35 @@ async def verify_design(verilog_code: str, testbench: str) -> Dict[str, Any]:
 async def generate_documentation(verilog_code: str, testbench: str) -> Dict[str, Any]:
     """Generate documentation for a Verilog design"""
     try:
-        # Save the files temporarily
-        temp_verilog = Path("mcp_output") / "temp.v"
-        temp_tb = Path("mcp_output") / "temp_tb.sv"
-        
-        temp_verilog.write_text(verilog_code)
-        temp_tb.write_text(testbench)
-        
-        # Generate documentation
-        doc_results = verilog_agent.generate_documentation(temp_verilog, temp_tb)
-        
-        # Clean up
-        temp_verilog.unlink()
-        temp_tb.unlink()
-        
-        return doc_results
+        # Generate documentation straight from the posted sources
+        ctx = request_context(verilog_code, testbench)
+        stem = ctx.verilog_file.stem
+        try:
+            results = await get_agent().generate_documentation(ctx.verilog_file, ctx.testbench_file, ctx)
+            return await asyncio.to_thread(collect_outputs, results, stem)
+        finally:
+            # Nothing written for this request is left behind
+            await asyncio.to_thread(remove_outputs, stem)
     except Exception as e:
         logger.error(f"Documentation generation failed: {str(e)}")
         raise
 
-# FastAPI endpoints
-@app.post("/design/generate", response_model=DesignResponse)
-async def api_generate_design(request: DesignRequest) -> Dict[str, Any]:
-    """Generate a complete Verilog design using the AI Agent"""
-    return await generate_design(request.description, request.module_name)
+def build_sse_app():
+    """Build an ASGI app serving the MCP tools over the SSE transport"""
+    from mcp.server.sse import SseServerTransport
+    from starlette.applications import Starlette
+    from starlette.routing import Mount, Route
 
-@app.get("/design/{design_id}")
-async def api_get_design(design_id: str) -> Dict[str, Any]:
-    """Retrieve a previously generated design"""
-    return await get_design(design_id)
+    sse = SseServerTransport("/messages/")
 
-@app.post("/design/optimize")
-async def api_optimize_design(verilog_code: str) -> Dict[str, Any]:
-    """Optimize an existing Verilog design"""
-    return await optimize_design(verilog_code)
+    async def handle_sse(request):
+        async with sse.connect_sse(request.scope, request.receive, request._send) as (read, write):
+            await server.serve(read, write)
 
-@app.post("/design/verify")
-async def api_verify_design(verilog_code: str, testbench: str) -> Dict[str, Any]:
-    """Verify a Verilog design"""
-    return await verify_design(verilog_code, testbench)
-
-@app.post("/design/document")
-async def api_generate_documentation(verilog_code: str, testbench: str) -> Dict[str, Any]:
-    """Generate documentation for a Verilog design"""
-    return await generate_documentation(verilog_code, testbench)
+    return Starlette(routes=[
+        Route("/sse", endpoint=handle_sse),
+        Mount("/messages/", app=sse.handle_post_message),
+    ])
 
 async def main():
     """Main entry point for the MCP server"""
@@ -193,4 +230,9 @@ async def main():
         raise
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    if "--http" in sys.argv:
+        import uvicorn
+        Path("mcp_output").mkdir(exist_ok=True)
+        uvicorn.run(build_sse_app(), host="0.0.0.0", port=8000)
+    else:
+        asyncio.run(main()) 
\ No newline at end of file
@@ -6,87 +6,135 @@ Coordinates all components for Verilog code generation, optimization, verificati
 
 import asyncio
 import logging
+import uuid
 from pathlib import Path
-from typing import Dict, Any, Optional
-from verilog_generator import VerilogGenerator
+from typing import Dict, Any, List, Optional, Tuple
+from verilog_generator import VerilogGenerator, run_event_loop
 from design_optimizer import DesignOptimizer
 from design_verifier import DesignVerifier
 from doc_generator import DocGenerator
+from verilog_scan import ToolContext, read_source
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def _run_optimizer(verilog_file: Path, verilog_content: Optional[str] = None) -> Tuple[Dict[str, Any], str]:
+    """Analyze a design and return the optimization report and optimized code."""
+    optimizer = DesignOptimizer(str(verilog_file), verilog_content)
+    optimization_report = optimizer.optimize_all()
+    return optimization_report, optimizer.apply_optimizations(optimization_report)
+
+def _run_verifier(verilog_file: Path, testbench_file: Path,
+                  ctx: Optional[ToolContext] = None) -> Tuple[Dict[str, Any], str, str]:
+    """Verify a design and return the report, assertions and coverage model."""
+    verifier = DesignVerifier(str(verilog_file), str(testbench_file), ctx)
+    verification_report = verifier.verify_all()
+    return verification_report, verifier.generate_assertions(), verifier.generate_coverage_model()
+
+def _run_doc_generator(verilog_file: Path, testbench_file: Path,
+                       ctx: Optional[ToolContext] = None) -> Dict[str, str]:
+    """Generate all documentation formats for a design."""
+    return DocGenerator(str(verilog_file), str(testbench_file), ctx).generate_all()
+
+# Directories already created by this process
+_created_dirs = set()
+
+def ensure_dir(path: Path) -> Path:
+    """Create a directory tree once per process."""
+    if path not in _created_dirs:
+        path.mkdir(parents=True, exist_ok=True)
+        _created_dirs.add(path)
+    return path
+
+def _write_all(contents: Dict[Path, str]) -> None:
+    """Write each file with a single encoded write."""
+    for path, content in contents.items():
+        path.write_bytes(content.encode("utf-8"))
+
+async def write_files(contents: Dict[Path, str]) -> None:
+    """Write a batch of small files in one worker thread without blocking the event loop."""
+    await asyncio.to_thread(_write_all, contents)
+
 class VerilogAIAgent:
-    def __init__(self, output_dir: str = "test_output"):
+    def __init__(self, output_dir: str = "test_output", max_concurrency: int = 4):
         """Initialize the AI agent."""
         self.output_dir = Path(output_dir)
-        self.output_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Create the output root up front so the stages never need to
+        ensure_dir(self.output_dir)
         self.generator = VerilogGenerator()
+        
+        # Bound the number of LLM generation requests in flight at once
+        self._llm_sem = asyncio.Semaphore(max_concurrency)
 
-    async def generate_design(self, description: str, module_name: Optional[str] = None) -> Dict[str, Path]:
-        """Generate Verilog design and testbench."""
+    async def generate_design(self, description: str, module_name: Optional[str] = None,
+                              use_cache: bool = True) -> Dict[str, Path]:
+        """Generate Verilog design and testbench.
+        
+        Each design gets its own directory, so designs sharing a module name
+        never overwrite each other's files.
+        """
         logger.info("Stage 1: Generating Verilog design...")
         
-        # Generate Verilog code and testbench
-        await self.generator.generate(
-            description=description,
-            output_dir=str(self.output_dir),
-            module_name=module_name,
-            generate_testbench=True
-        )
-
-        # Get file paths
-        verilog_file = self.output_dir / f"{module_name or 'design'}.v"
-        testbench_file = self.output_dir / f"{module_name or 'design'}_tb.sv"
-
-        return {
-            "verilog": verilog_file,
-            "testbench": testbench_file
-        }
+        # Generate Verilog code and testbench, keeping the paths actually written
+        design_dir = self.output_dir / f"{module_name or 'design'}_{uuid.uuid4().hex}"
+        async with self._llm_sem:
+            return await self.generator.generate(
+                description=description,
+                output_dir=str(design_dir),
+                module_name=module_name,
+                generate_testbench=True,
+                use_cache=use_cache
+            )
 
-    def optimize_design(self, verilog_file: Path) -> Dict[str, Any]:
-        """Optimize the generated design."""
+    async def _optimize(self, verilog_file: Path,
+                        verilog_content: Optional[str] = None) -> Tuple[Dict[str, Any], str]:
+        """Optimize the design and return the results along with the optimized code."""
         logger.info("Stage 2: Optimizing design...")
         
-        # Initialize optimizer
-        optimizer = DesignOptimizer(str(verilog_file))
-        
-        # Perform optimization
-        optimization_report = optimizer.optimize_all()
-        
-        # Apply optimizations
-        optimized_code = optimizer.apply_optimizations(optimization_report)
+        # Perform and apply optimizations in a worker thread
+        optimization_report, optimized_code = await asyncio.to_thread(
+            _run_optimizer, verilog_file, verilog_content
+        )
         
-        # Save optimized code
-        optimized_file = self.output_dir / f"{verilog_file.stem}_optimized.v"
-        optimized_file.write_text(optimized_code)
+        # Save optimized code next to the design
+        optimized_file = verilog_file.with_name(f"{verilog_file.stem}_optimized.v")
+        await write_files({optimized_file: optimized_code})
         
         return {
             "report": optimization_report,
             "optimized_file": optimized_file
-        }
+        }, optimized_code
+
+    async def optimize_design(self, verilog_file: Path, verilog_content: Optional[str] = None) -> Dict[str, Any]:
+        """Optimize the generated design.
+        
+        When verilog_content is given the file is never read; its name only
+        names the optimized output.
+        """
+        optimization_results, _ = await self._optimize(verilog_file, verilog_content)
+        return optimization_results
 
-    def verify_design(self, verilog_file: Path, testbench_file: Path) -> Dict[str, Any]:
+    async def verify_design(self, verilog_file: Path, testbench_file: Path,
+                            ctx: Optional[ToolContext] = None) -> Dict[str, Any]:
         """Verify the design."""
         logger.info("Stage 3: Verifying design...")
         
-        # Initialize verifier
-        verifier = DesignVerifier(str(verilog_file), str(testbench_file))
-        
-        # Perform verification
-        verification_report = verifier.verify_all()
-        
-        # Generate assertions and coverage
-        assertions = verifier.generate_assertions()
-        coverage_model = verifier.generate_coverage_model()
+        # Perform verification and generate assertions and coverage in a worker thread;
+        # the scans it caches on ctx stay shared with the other stages
+        verification_report, assertions, coverage_model = await asyncio.to_thread(
+            _run_verifier, verilog_file, testbench_file, ctx
+        )
         
-        # Save generated files
-        assertions_file = self.output_dir / f"{verilog_file.stem}_assertions.sv"
-        coverage_file = self.output_dir / f"{verilog_file.stem}_coverage.sv"
+        # Save generated files next to the design
+        assertions_file = verilog_file.with_name(f"{verilog_file.stem}_assertions.sv")
+        coverage_file = verilog_file.with_name(f"{verilog_file.stem}_coverage.sv")
         
-        assertions_file.write_text(assertions)
-        coverage_file.write_text(coverage_model)
+        await write_files({
+            assertions_file: assertions,
+            coverage_file: coverage_model
+        })
         
         return {
             "report": verification_report,
@@ -94,82 +142,142 @@ class VerilogAIAgent:
             "coverage_file": coverage_file
         }
 
-    def generate_documentation(self, verilog_file: Path, testbench_file: Path) -> Dict[str, Path]:
+    async def generate_documentation(self, verilog_file: Path, testbench_file: Path,
+                                     ctx: Optional[ToolContext] = None) -> Dict[str, Path]:
         """Generate documentation."""
         logger.info("Stage 4: Generating documentation...")
         
-        # Initialize documentation generator
-        doc_gen = DocGenerator(str(verilog_file), str(testbench_file))
-        
-        # Generate documentation
-        docs = doc_gen.generate_all()
-        
-        # Create docs directory
-        docs_dir = self.output_dir / "docs"
-        docs_dir.mkdir(parents=True, exist_ok=True)
+        # Generate documentation in a worker thread
+        docs = await asyncio.to_thread(
+            _run_doc_generator, verilog_file, testbench_file, ctx
+        )
         
-        # Save documentation files
-        doc_files = {}
-        for format_name, content in docs.items():
-            file_path = docs_dir / f"documentation.{format_name}"
-            file_path.write_text(content)
-            doc_files[format_name] = file_path
+        # Save documentation files next to the design
+        doc_files = {
+            format_name: verilog_file.with_name(f"{verilog_file.stem}_documentation.{format_name}")
+            for format_name in docs
+        }
+        await write_files({
+            doc_files[format_name]: content
+            for format_name, content in docs.items()
+        })
         
         return doc_files
 
-    async def process_design(self, description: str, module_name: Optional[str] = None) -> Dict[str, Any]:
+    async def process_design(self, description: str, module_name: Optional[str] = None,
+                             use_cache: bool = True) -> Dict[str, Any]:
         """Process the entire design pipeline."""
         try:
             # Stage 1: Generate Design
-            files = await self.generate_design(description, module_name)
+            files = await self.generate_design(description, module_name, use_cache)
             logger.info(f"Design generated: {files['verilog']}")
             logger.info(f"Testbench generated: {files['testbench']}")
 
-            # Stage 2: Optimize Design
-            optimization_results = self.optimize_design(files["verilog"])
-            logger.info(f"Design optimized: {optimization_results['optimized_file']}")
+            # Stages 2-4: Optimize, verify and document
+            return await self._analyze_design(files)
 
-            # Stage 3: Verify Design
-            verification_results = self.verify_design(
-                optimization_results["optimized_file"],
-                files["testbench"]
-            )
-            logger.info("Design verification completed")
+        except Exception as e:
+            logger.error(f"Design processing failed: {str(e)}")
+            raise
 
-            # Stage 4: Generate Documentation
-            documentation_files = self.generate_documentation(
-                optimization_results["optimized_file"],
-                files["testbench"]
-            )
-            logger.info("Documentation generated")
-
-            # Prepare final report
-            return {
-                "files": {
-                    "original": files,
-                    "optimized": optimization_results["optimized_file"],
-                    "verification": {
-                        "assertions": verification_results["assertions_file"],
-                        "coverage": verification_results["coverage_file"]
-                    },
-                    "documentation": documentation_files
-                },
-                "reports": {
-                    "optimization": optimization_results["report"],
-                    "verification": verification_results["report"]
-                }
-            }
+    async def process_designs(self, specs: List[Tuple[str, Optional[str], bool]],
+                              workers: int = 4) -> List[Dict[str, Any]]:
+        """Process several (description, module_name, use_cache) designs as a two-stage pipeline.
+        
+        Generated designs are queued for a fixed set of analysis workers, so
+        LLM generation of later designs overlaps with analysis of earlier ones.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=workers)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(specs)
+
+        async def generate(index: int, description: str, module_name: Optional[str],
+                           use_cache: bool) -> None:
+            files = await self.generate_design(description, module_name, use_cache)
+            logger.info(f"Design generated: {files['verilog']}")
+            await queue.put((index, files))
+
+        async def finish_generation() -> None:
+            # Release the workers once every design is queued
+            await asyncio.gather(*generators)
+            for _ in range(workers):
+                await queue.put(None)
 
+        async def consume() -> None:
+            while (item := await queue.get()) is not None:
+                index, files = item
+                results[index] = await self._analyze_design(files)
+
+        # Generation concurrency is bounded by the LLM semaphore
+        generators = [
+            asyncio.create_task(generate(index, description, module_name, use_cache))
+            for index, (description, module_name, use_cache) in enumerate(specs)
+        ]
+        tasks = [
+            *generators,
+            asyncio.create_task(finish_generation()),
+            *(asyncio.create_task(consume()) for _ in range(workers))
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
         except Exception as e:
             logger.error(f"Design processing failed: {str(e)}")
             raise
+        finally:
+            # After a failure the other tasks could wait on the queue forever, so
+            # cancel whatever is still running
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return results
+
+    async def _analyze_design(self, files: Dict[str, Path]) -> Dict[str, Any]:
+        """Run the optimization, verification and documentation stages on generated files."""
+        # Stage 2: Optimize Design
+        optimization_results, optimized_code = await self._optimize(files["verilog"])
+        logger.info(f"Design optimized: {optimization_results['optimized_file']}")
+
+        # Read the testbench once and share both sources with the remaining stages
+        ctx = ToolContext(
+            verilog_file=optimization_results["optimized_file"],
+            testbench_file=files["testbench"],
+            verilog_content=optimized_code,
+            testbench_content=await asyncio.to_thread(read_source, files["testbench"])
+        )
+
+        # Stages 3 and 4 both only read the optimized design, so run them together
+        verification_results, documentation_files = await asyncio.gather(
+            self.verify_design(ctx.verilog_file, ctx.testbench_file, ctx),
+            self.generate_documentation(ctx.verilog_file, ctx.testbench_file, ctx)
+        )
+        logger.info("Design verification completed")
+        logger.info("Documentation generated")
+
+        # Prepare final report
+        return {
+            "files": {
+                "original": files,
+                "optimized": optimization_results["optimized_file"],
+                "verification": {
+                    "assertions": verification_results["assertions_file"],
+                    "coverage": verification_results["coverage_file"]
+                },
+                "documentation": documentation_files
+            },
+            "reports": {
+                "optimization": optimization_results["report"],
+                "verification": verification_results["report"]
+            }
+        }
 
 async def main():
     """Main entry point for the Verilog AI Agent."""
-    try:
-        # Initialize agent
-        agent = VerilogAIAgent()
+    # Initialize agent
+    agent = VerilogAIAgent()
 
+    try:
         # Process RISC processor design
         description = """
         Design a 5-stage pipelined RISC processor core with the following specifications:
@@ -201,4 +309,4 @@ async def main():
         raise
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    run_event_loop(main()) 
\ No newline at end of file
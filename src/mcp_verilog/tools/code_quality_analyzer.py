@@ -8,14 +8,46 @@ import re
 import json
 from pathlib import Path
 import logging
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, Iterator, List, Tuple, Optional, Any
 from dataclasses import dataclass
 from enum import Enum
+# Package-relative as mcp_verilog.tools; flat when the tools directory itself is on sys.path
+try:
+    from .verilog_scan import ToolContext
+except ImportError:
+    from verilog_scan import ToolContext
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Probes over the Verilog source, scanned once per analyzer
+_VERILOG_PROBES = {
+    "parameter": re.compile(r'parameter\s+\w+\s*=\s*\d+', re.ASCII),
+    "clk_port": re.compile(r'input\s+wire\s+clk', re.ASCII),
+    "debug": re.compile(r'debug_\w+', re.ASCII),
+    "alu_case": re.compile(r'case\s*\(.*op.*\)', re.ASCII),
+    "alu_flags": re.compile(r'zero|carry|overflow', re.ASCII),
+    "reg_file": re.compile(r'reg\s+\[.*\]\s+reg_file', re.ASCII),
+    "reg_control": re.compile(r'reg_write|reg_read', re.ASCII),
+    "cache": re.compile(r'cache_\w+', re.ASCII),
+    "cache_control": re.compile(r'cache_hit|cache_miss', re.ASCII),
+    "if_stage": re.compile(r'if_\w+', re.ASCII),
+    "id_stage": re.compile(r'id_\w+', re.ASCII),
+    "ex_stage": re.compile(r'ex_\w+', re.ASCII),
+    "mem_stage": re.compile(r'mem_\w+', re.ASCII),
+    "wb_stage": re.compile(r'wb_\w+', re.ASCII),
+    "posedge_clk": re.compile(r'@\(posedge\s+clk\)', re.ASCII),
+}
+_PIPELINE_STAGES = ("IF", "ID", "EX", "MEM", "WB")
+
+# Probes over the testbench
+_TESTBENCH_PROBES = {
+    "test_case": re.compile(r'Test case \d+:', re.ASCII),
+    "assertion": re.compile(r'assert|property', re.ASCII),
+    "coverage": re.compile(r'covergroup|coverpoint', re.ASCII),
+}
+
 class ComponentType(Enum):
     """Enum for different types of components in the RISC processor."""
     ALU = "ALU"
@@ -25,7 +57,7 @@ class ComponentType(Enum):
     PIPELINE_STAGE = "Pipeline Stage"
     DEBUG_INTERFACE = "Debug Interface"
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ComponentAnalysis:
     """Data class to store analysis results for each component."""
     component_type: ComponentType
@@ -35,13 +67,17 @@ class ComponentAnalysis:
     suggestions: List[str]
 
 class CodeQualityAnalyzer:
-    def __init__(self, verilog_file: str, testbench_file: str):
+    def __init__(self, verilog_file: str, testbench_file: str, ctx: Optional[ToolContext] = None):
         """Initialize the analyzer with paths to Verilog and testbench files."""
         self.verilog_file = Path(verilog_file)
         self.testbench_file = Path(testbench_file)
-        self.verilog_content = self.verilog_file.read_text()
-        self.testbench_content = self.testbench_file.read_text()
-        self.analysis_results: Dict[ComponentType, ComponentAnalysis] = {}
+        # Share sources already loaded by the caller instead of re-reading the files
+        self.ctx = ctx if ctx is not None else ToolContext(self.verilog_file, self.testbench_file)
+        self.verilog_content = self.ctx.verilog_content
+        self.testbench_content = self.ctx.testbench_content
+        # Scan both sources once; the analyze_* methods only look up results
+        self.verilog_probes = self.ctx.scan("quality_verilog", "verilog", _VERILOG_PROBES)
+        self.testbench_probes = self.ctx.scan("quality_testbench", "testbench", _TESTBENCH_PROBES)
 
     def analyze_module_structure(self) -> List[str]:
         """Analyze the overall module structure."""
@@ -49,17 +85,17 @@ class CodeQualityAnalyzer:
         suggestions = []
 
         # Check for parameter definitions
-        if not re.search(r'parameter\s+\w+\s*=\s*\d+', self.verilog_content):
+        if not self.verilog_probes["parameter"]:
             issues.append("Missing parameter definitions")
             suggestions.append("Add parameter definitions for cache sizes, register count, etc.")
 
         # Check for port declarations
-        if not re.search(r'input\s+wire\s+clk', self.verilog_content):
+        if not self.verilog_probes["clk_port"]:
             issues.append("Missing clock port")
             suggestions.append("Add clock port declaration")
 
         # Check for debug interface
-        if not re.search(r'debug_\w+', self.verilog_content):
+        if not self.verilog_probes["debug"]:
             issues.append("Incomplete debug interface")
             suggestions.append("Add comprehensive debug interface with monitoring signals")
 
@@ -71,12 +107,12 @@ class CodeQualityAnalyzer:
         suggestions = []
 
         # Check for ALU operation codes
-        if not re.search(r'case\s*\(.*op.*\)', self.verilog_content):
+        if not self.verilog_probes["alu_case"]:
             issues.append("Missing ALU operation codes")
             suggestions.append("Implement full ALU with all required operations")
 
         # Check for ALU flags
-        if not re.search(r'zero|carry|overflow', self.verilog_content):
+        if not self.verilog_probes["alu_flags"]:
             issues.append("Missing ALU flags")
             suggestions.append("Add ALU flags for zero, carry, and overflow conditions")
 
@@ -94,12 +130,12 @@ class CodeQualityAnalyzer:
         suggestions = []
 
         # Check for register file implementation
-        if not re.search(r'reg\s+\[.*\]\s+reg_file', self.verilog_content):
+        if not self.verilog_probes["reg_file"]:
             issues.append("Missing register file implementation")
             suggestions.append("Implement 32-register file with read/write ports")
 
         # Check for register file control
-        if not re.search(r'reg_write|reg_read', self.verilog_content):
+        if not self.verilog_probes["reg_control"]:
             issues.append("Missing register file control signals")
             suggestions.append("Add register file control signals and logic")
 
@@ -117,12 +153,12 @@ class CodeQualityAnalyzer:
         suggestions = []
 
         # Check for cache implementation
-        if not re.search(r'cache_\w+', self.verilog_content):
+        if not self.verilog_probes["cache"]:
             issues.append("Missing cache implementation")
             suggestions.append("Implement instruction and data caches")
 
         # Check for cache control
-        if not re.search(r'cache_hit|cache_miss', self.verilog_content):
+        if not self.verilog_probes["cache_control"]:
             issues.append("Missing cache control signals")
             suggestions.append("Add cache hit/miss detection and handling")
 
@@ -140,14 +176,13 @@ class CodeQualityAnalyzer:
         suggestions = []
 
         # Check for all pipeline stages
-        stages = ["IF", "ID", "EX", "MEM", "WB"]
-        for stage in stages:
-            if not re.search(rf'{stage.lower()}_\w+', self.verilog_content):
+        for stage in _PIPELINE_STAGES:
+            if not self.verilog_probes[f"{stage.lower()}_stage"]:
                 issues.append(f"Missing {stage} stage implementation")
                 suggestions.append(f"Implement complete {stage} stage with proper control")
 
         # Check for pipeline registers
-        if not re.search(r'@\(posedge\s+clk\)', self.verilog_content):
+        if not self.verilog_probes["posedge_clk"]:
             issues.append("Missing pipeline registers")
             suggestions.append("Add pipeline registers between stages")
 
@@ -165,17 +200,17 @@ class CodeQualityAnalyzer:
         suggestions = []
 
         # Check for test scenarios
-        if not re.search(r'Test case \d+:', self.testbench_content):
+        if not self.testbench_probes["test_case"]:
             issues.append("Limited test scenarios")
             suggestions.append("Add more comprehensive test scenarios")
 
         # Check for assertions
-        if not re.search(r'assert|property', self.testbench_content):
+        if not self.testbench_probes["assertion"]:
             issues.append("Missing assertions")
             suggestions.append("Add SystemVerilog assertions for pipeline stages")
 
         # Check for coverage points
-        if not re.search(r'covergroup|coverpoint', self.testbench_content):
+        if not self.testbench_probes["coverage"]:
             issues.append("Missing coverage points")
             suggestions.append("Add functional and code coverage points")
 
@@ -213,35 +248,36 @@ class CodeQualityAnalyzer:
 
     def generate_improvement_report(self, analysis_results: Dict[str, Any]) -> str:
         """Generate a detailed improvement report."""
-        report = []
-        report.append("=== RISC Processor Code Quality Analysis Report ===\n")
+        return "\n".join(self._report_lines(analysis_results))
+
+    def _report_lines(self, analysis_results: Dict[str, Any]) -> Iterator[str]:
+        """Yield the lines of the improvement report."""
+        yield "=== RISC Processor Code Quality Analysis Report ===\n"
 
         # Module Structure
-        report.append("1. Module Structure Analysis:")
+        yield "1. Module Structure Analysis:"
         for issue in analysis_results["module_structure"]["issues"]:
-            report.append(f"   - Issue: {issue}")
+            yield f"   - Issue: {issue}"
         for suggestion in analysis_results["module_structure"]["suggestions"]:
-            report.append(f"   - Suggestion: {suggestion}")
-        report.append("")
+            yield f"   - Suggestion: {suggestion}"
+        yield ""
 
         # Components
-        report.append("2. Component Analysis:")
+        yield "2. Component Analysis:"
         for component_name, analysis in analysis_results["components"].items():
-            report.append(f"\n   {component_name.upper()}:")
-            report.append(f"   - Implementation Level: {analysis.implementation_level}")
+            yield f"\n   {component_name.upper()}:"
+            yield f"   - Implementation Level: {analysis.implementation_level}"
             for issue in analysis.issues:
-                report.append(f"   - Issue: {issue}")
+                yield f"   - Issue: {issue}"
             for suggestion in analysis.suggestions:
-                report.append(f"   - Suggestion: {suggestion}")
+                yield f"   - Suggestion: {suggestion}"
 
         # Testbench
-        report.append("\n3. Testbench Analysis:")
+        yield "\n3. Testbench Analysis:"
         for issue in analysis_results["testbench"]["issues"]:
-            report.append(f"   - Issue: {issue}")
+            yield f"   - Issue: {issue}"
         for suggestion in analysis_results["testbench"]["suggestions"]:
-            report.append(f"   - Suggestion: {suggestion}")
-
-        return "\n".join(report)
+            yield f"   - Suggestion: {suggestion}"
 
 def main():
     """Main entry point for the code quality analyzer."""
@@ -5,17 +5,100 @@ Analyzes and optimizes Verilog designs for performance, area, and power.
 """
 
 import re
-import json
+import functools
+import hashlib
+import threading
 from pathlib import Path
 import logging
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
 from enum import Enum
+# Package-relative as mcp_verilog.tools; flat when the tools directory itself is on sys.path
+try:
+    from .verilog_scan import MMAP_THRESHOLD, byte_probes, dump_json, mapped_source, read_source, scan_probes
+except ImportError:
+    from verilog_scan import MMAP_THRESHOLD, byte_probes, dump_json, mapped_source, read_source, scan_probes
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Probes over the Verilog source, scanned once per optimizer
+_PROBES = {
+    "clk_block": re.compile(r'always\s*@\s*\(posedge\s+clk\)', re.ASCII),
+    "nested_if": re.compile(r'if.*else.*if.*else', re.ASCII),
+    "reg": re.compile(r'reg\s+\[[^\]\n]*\]', re.ASCII),
+    "wire_pair": re.compile(r'wire\s+\[[^\]\n]*\].*?wire\s+\[[^\]\n]*\]', re.ASCII),
+    "clock_gating": re.compile(r'clock_en|clk_en|gated_clk', re.ASCII),
+    "enable": re.compile(r'enable|en\s*=', re.ASCII),
+    "posedge_clk": re.compile(r'@\s*\(posedge\s+clk\)', re.ASCII),
+    "negedge_rst": re.compile(r'negedge\s+rst', re.ASCII),
+}
+# The same probes over raw bytes, for designs scanned from a file mapping
+_BYTE_PROBES = byte_probes(_PROBES)
+# Probes whose number of matches is reported, not just their presence
+_COUNTED_PROBES = ("clk_block", "reg")
+
+# Tokens that must follow "assign" in order on one line for a nested ternary
+_TERNARY_CHAIN = ("=", "?", ":", "?", ":")
+_TERNARY_CHAIN_BYTES = tuple(token.encode() for token in _TERNARY_CHAIN)
+
+def _has_nested_ternary(text) -> int:
+    """Linear scan for an assign line with two chained ternaries.
+    
+    Matches the same lines as the former assign...=...?...:...?...: regex probe
+    without its backtracking: each line is searched left to right for the
+    tokens in order.
+    Works on str and on bytes-like views such as mmap.
+    """
+    if isinstance(text, str):
+        newline, assign, chain = "\n", "assign", _TERNARY_CHAIN
+    else:
+        newline, assign, chain = b"\n", b"assign", _TERNARY_CHAIN_BYTES
+    
+    start = text.find(assign)
+    while start != -1:
+        end = text.find(newline, start)
+        if end == -1:
+            end = len(text)
+        pos = start + len(assign)
+        for token in chain:
+            pos = text.find(token, pos, end)
+            if pos == -1:
+                break
+            pos += 1
+        else:
+            return 1
+        # A later "assign" on the same line cannot succeed where this one failed
+        start = text.find(assign, end)
+    return 0
+
+# Code transforms as (optimization type, enabling suggestion, method name)
+_TRANSFORMS = (
+    ("performance", "pipeline balancing", "_add_pipeline_registers"),
+    ("area", "resource sharing", "_optimize_resource_usage"),
+    ("power", "clock gating", "_add_clock_gating"),
+)
+
+# Probe results by content digest; results are shared, do not mutate
+_SCAN_CACHE: Dict[bytes, Dict[str, int]] = {}
+_SCAN_CACHE_SIZE = 256
+# Optimizers run in worker threads; the scan itself stays outside the lock
+_SCAN_CACHE_LOCK = threading.Lock()
+
+def _scan_design(content_hash: bytes, content, probes: Dict[str, re.Pattern]) -> Dict[str, int]:
+    """Scan a design once per distinct content, evicting the oldest entry when full."""
+    with _SCAN_CACHE_LOCK:
+        results = _SCAN_CACHE.get(content_hash)
+    if results is None:
+        results = scan_probes(content, probes, _COUNTED_PROBES)
+        results["nested_ternary"] = _has_nested_ternary(content)
+        with _SCAN_CACHE_LOCK:
+            if content_hash not in _SCAN_CACHE and len(_SCAN_CACHE) >= _SCAN_CACHE_SIZE:
+                del _SCAN_CACHE[next(iter(_SCAN_CACHE))]
+            _SCAN_CACHE[content_hash] = results
+    return results
+
 class OptimizationType(Enum):
     """Types of optimizations that can be performed."""
     PERFORMANCE = "performance"
@@ -23,7 +106,7 @@ class OptimizationType(Enum):
     POWER = "power"
     TIMING = "timing"
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class OptimizationResult:
     """Results of optimization analysis."""
     optimization_type: OptimizationType
@@ -33,11 +116,29 @@ class OptimizationResult:
     suggested_changes: List[str]
 
 class DesignOptimizer:
-    def __init__(self, verilog_file: str):
+    def __init__(self, verilog_file: str, verilog_content: Optional[str] = None):
         """Initialize the design optimizer."""
         self.verilog_file = Path(verilog_file)
-        self.verilog_content = self.verilog_file.read_text()
-        self.optimization_results: Dict[OptimizationType, OptimizationResult] = {}
+        # Reuse contents already loaded by the caller instead of re-reading the file
+        self._verilog_content = verilog_content
+        
+        # Scan the source once per distinct content; the analyze_* methods only look up results
+        if verilog_content is None and self.verilog_file.stat().st_size > MMAP_THRESHOLD:
+            # Large designs are scanned straight from the page cache without decoding
+            with mapped_source(self.verilog_file) as mapped:
+                self._hash = hashlib.blake2b(mapped, digest_size=16).digest()
+                self.probes = _scan_design(self._hash, mapped, _BYTE_PROBES)
+        else:
+            content = self.verilog_content
+            self._hash = hashlib.blake2b(content.encode(), digest_size=16).digest()
+            self.probes = _scan_design(self._hash, content, _PROBES)
+
+    @property
+    def verilog_content(self) -> str:
+        """Verilog source, loaded on first use when the design was scanned from a mapping."""
+        if self._verilog_content is None:
+            self._verilog_content = read_source(self.verilog_file)
+        return self._verilog_content
 
     def analyze_performance(self) -> OptimizationResult:
         """Analyze and optimize for performance."""
@@ -45,14 +146,14 @@ class DesignOptimizer:
         suggestions = []
 
         # Check critical path
-        if re.search(r'always\s*@\s*\(posedge\s+clk\)', self.verilog_content):
+        if self.probes["clk_block"]:
             # Analyze sequential logic
-            if re.search(r'if.*else.*if.*else', self.verilog_content):
+            if self.probes["nested_if"]:
                 improvements.append("Long combinational paths detected")
                 suggestions.append("Consider breaking down complex conditional logic")
 
         # Check pipeline depth
-        pipeline_stages = len(re.findall(r'always\s*@\s*\(posedge\s+clk\)', self.verilog_content))
+        pipeline_stages = self.probes["clk_block"]
         if pipeline_stages > 0:
             improvements.append(f"Current pipeline depth: {pipeline_stages}")
             suggestions.append("Consider pipeline balancing for optimal performance")
@@ -71,13 +172,13 @@ class DesignOptimizer:
         suggestions = []
 
         # Check register usage
-        reg_count = len(re.findall(r'reg\s+\[.*?\]', self.verilog_content))
+        reg_count = self.probes["reg"]
         if reg_count > 0:
             improvements.append(f"Current register count: {reg_count}")
             suggestions.append("Consider resource sharing for registers")
 
         # Check redundant logic
-        if re.search(r'wire\s+\[.*?\].*?wire\s+\[.*?\]', self.verilog_content):
+        if self.probes["wire_pair"]:
             improvements.append("Potential redundant wire declarations")
             suggestions.append("Consider combining wire declarations")
 
@@ -95,14 +196,14 @@ class DesignOptimizer:
         suggestions = []
 
         # Check clock gating opportunities
-        if re.search(r'always\s*@\s*\(posedge\s+clk\)', self.verilog_content):
-            if not re.search(r'clock_en|clk_en|gated_clk', self.verilog_content):
+        if self.probes["clk_block"]:
+            if not self.probes["clock_gating"]:
                 improvements.append("No clock gating detected")
                 suggestions.append("Consider adding clock gating for power reduction")
 
         # Check register enables
-        if re.search(r'reg\s+\[.*?\]', self.verilog_content):
-            if not re.search(r'enable|en\s*=', self.verilog_content):
+        if self.probes["reg"]:
+            if not self.probes["enable"]:
                 improvements.append("Registers without enable signals")
                 suggestions.append("Add enable signals to reduce switching activity")
 
@@ -120,13 +221,13 @@ class DesignOptimizer:
         suggestions = []
 
         # Check setup/hold time considerations
-        if re.search(r'@\s*\(posedge\s+clk\)', self.verilog_content):
-            if not re.search(r'negedge\s+rst', self.verilog_content):
+        if self.probes["posedge_clk"]:
+            if not self.probes["negedge_rst"]:
                 improvements.append("Synchronous reset detected")
                 suggestions.append("Consider using asynchronous reset for better timing")
 
         # Check combinational path depth
-        if re.search(r'assign.*=.*\?.*:.*\?.*:', self.verilog_content):
+        if self.probes["nested_ternary"]:
             improvements.append("Deep combinational paths detected")
             suggestions.append("Consider breaking down complex assignments")
 
@@ -171,30 +272,17 @@ class DesignOptimizer:
 
     def apply_optimizations(self, report: Dict[str, Any]) -> str:
         """Apply suggested optimizations to the Verilog code."""
-        optimized_code = self.verilog_content
-
-        # Apply performance optimizations
-        if "performance" in report["optimizations"]:
-            perf_changes = report["optimizations"]["performance"]["suggested_changes"]
-            for change in perf_changes:
-                if "pipeline balancing" in change.lower():
-                    optimized_code = self._add_pipeline_registers(optimized_code)
-
-        # Apply area optimizations
-        if "area" in report["optimizations"]:
-            area_changes = report["optimizations"]["area"]["suggested_changes"]
-            for change in area_changes:
-                if "resource sharing" in change.lower():
-                    optimized_code = self._optimize_resource_usage(optimized_code)
-
-        # Apply power optimizations
-        if "power" in report["optimizations"]:
-            power_changes = report["optimizations"]["power"]["suggested_changes"]
-            for change in power_changes:
-                if "clock gating" in change.lower():
-                    optimized_code = self._add_clock_gating(optimized_code)
-
-        return optimized_code
+        # Collect the enabled transforms first, then run them in one pass over the code
+        transforms = [
+            getattr(self, method)
+            for opt_type, trigger, method in _TRANSFORMS
+            if opt_type in report["optimizations"] and any(
+                trigger in change.lower()
+                for change in report["optimizations"][opt_type]["suggested_changes"]
+            )
+        ]
+
+        return functools.reduce(lambda code, transform: transform(code), transforms, self.verilog_content)
 
     def _add_pipeline_registers(self, code: str) -> str:
         """Add pipeline registers to improve timing."""
@@ -222,7 +310,7 @@ def main():
 
         # Save optimization report
         report_file = Path("test_output/optimization_report.json")
-        report_file.write_text(json.dumps(optimization_report, indent=2))
+        report_file.write_bytes(dump_json(optimization_report))
         logger.info(f"Optimization report generated: {report_file}")
 
         # Apply optimizations and save optimized code
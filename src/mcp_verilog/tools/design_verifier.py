@@ -5,17 +5,82 @@ Performs formal verification, assertion checking, and coverage analysis.
 """
 
 import re
-import json
+from functools import cached_property
 from pathlib import Path
 import logging
 from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
 from enum import Enum
+# Package-relative as mcp_verilog.tools; flat when the tools directory itself is on sys.path
+try:
+    from .verilog_scan import ToolContext, dump_json
+except ImportError:
+    from verilog_scan import ToolContext, dump_json
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Probes over the design and testbench, scanned once per verifier
+_VERILOG_PROBES = {
+    "property": re.compile(r'property\s+\w+'),
+    "assume": re.compile(r'assume\s+\w+'),
+    "default": re.compile(r'default\s*:'),
+    "reset_input": re.compile(r'input.*reset'),
+    "clk_block": re.compile(r'always\s*@\s*\(posedge\s+clk\)'),
+    "statement": ";",
+    "branch": re.compile(r'if|case'),
+    "state": "state",
+    "data": "data",
+}
+_TESTBENCH_PROBES = {
+    "covergroup": re.compile(r'covergroup\s+\w+'),
+    "coverpoint": re.compile(r'coverpoint\s+\w+'),
+    "assert": re.compile(r'assert\s+\w+'),
+    "temporal": re.compile(r'##\d+|@\(posedge'),
+    # Same matches as assert.*?;|if.*?;|else.*?; written as a negated class, so
+    # each candidate runs to the first ";" or newline without lazy stepping
+    "cov_stmt": re.compile(r'(?:assert|if|else)[^;\n]*;'),
+}
+# Probes whose number of matches is reported, not just their presence, with the
+# count at which their coverage saturates at 100% (None when it never does)
+_VERILOG_COUNTED = {"property": 5, "statement": None}
+_TESTBENCH_COUNTED = {"covergroup": 4, "assert": 10, "cov_stmt": None}
+
+# Generated SVA and coverage blocks, emitted verbatim when the design calls for them
+_RESET_ASSERTION = """
+            // Reset assertion
+            property reset_assertion;
+                @(posedge clk) reset |-> ##1 (state == IDLE);
+            endproperty
+            assert property(reset_assertion);
+            """
+_PIPELINE_ASSERTION = """
+            // Pipeline validity assertion
+            property pipeline_valid;
+                @(posedge clk) disable iff (reset)
+                $stable(valid) |-> ##1 $stable(data);
+            endproperty
+            assert property(pipeline_valid);
+            """
+_STATE_COVERAGE = """
+            covergroup state_coverage;
+                state_cp: coverpoint state {
+                    bins states[] = {[0:$]};
+                    bins transitions[] = ([0:$] => [0:$]);
+                }
+            endgroup
+            """
+_DATA_COVERAGE = """
+            covergroup data_coverage;
+                data_cp: coverpoint data {
+                    bins zero = {0};
+                    bins small = {[1:10]};
+                    bins large = {[11:$]};
+                }
+            endgroup
+            """
+
 class VerificationType(Enum):
     """Types of verification that can be performed."""
     FORMAL = "formal"
@@ -33,31 +98,53 @@ class VerificationResult:
     suggestions: List[str]
 
 class DesignVerifier:
-    def __init__(self, verilog_file: str, testbench_file: str):
+    def __init__(self, verilog_file: str, testbench_file: str, ctx: Optional[ToolContext] = None):
         """Initialize the design verifier."""
         self.verilog_file = Path(verilog_file)
         self.testbench_file = Path(testbench_file)
-        self.verilog_content = self.verilog_file.read_text()
-        self.testbench_content = self.testbench_file.read_text()
+        # Share sources already loaded by the caller; otherwise each file is read on first use
+        self.ctx = ctx if ctx is not None else ToolContext(self.verilog_file, self.testbench_file)
         self.verification_results: Dict[VerificationType, VerificationResult] = {}
 
+    @cached_property
+    def verilog_content(self) -> str:
+        """Verilog source, read on first use."""
+        return self.ctx.verilog_content
+
+    @cached_property
+    def testbench_content(self) -> str:
+        """Testbench source, read on first use."""
+        return self.ctx.testbench_content
+
+    # Each source is scanned once, on first use, straight from a mapping when it is
+    # large; the verify_* and generate_* methods only look up results
+    @cached_property
+    def verilog_probes(self) -> Dict[str, int]:
+        """Probe results over the Verilog source."""
+        return self.ctx.scan("verifier_verilog", "verilog", _VERILOG_PROBES, _VERILOG_COUNTED)
+
+    @cached_property
+    def testbench_probes(self) -> Dict[str, int]:
+        """Probe results over the testbench source."""
+        return self.ctx.scan("verifier_testbench", "testbench", _TESTBENCH_PROBES, _TESTBENCH_COUNTED)
+
     def verify_formal_properties(self) -> VerificationResult:
         """Verify formal properties of the design."""
         issues = []
         suggestions = []
         coverage = 0.0
 
-        # Check for formal properties
-        if not re.search(r'property\s+\w+', self.verilog_content):
+        # Check for formal properties; one scan gives both presence and count
+        property_count = self.verilog_probes["property"]
+        if not property_count:
             issues.append("No formal properties defined")
             suggestions.append("Add SVA properties for critical behavior")
             coverage = 0.0
         else:
-            property_count = len(re.findall(r'property\s+\w+', self.verilog_content))
             coverage = min(100.0, property_count * 20.0)  # 20% per property, max 100%
 
         # Check for assumptions
-        if not re.search(r'assume\s+\w+', self.verilog_content):
+        if not self.verilog_probes["assume"]:
             issues.append("No assumptions defined")
             suggestions.append("Add assumptions about input behavior")
 
@@ -75,16 +162,16 @@ class DesignVerifier:
         suggestions = []
         coverage = 0.0
 
-        # Check for covergroups
-        if not re.search(r'covergroup\s+\w+', self.testbench_content):
+        # Check for covergroups; one scan gives both presence and count
+        covergroup_count = self.testbench_probes["covergroup"]
+        if not covergroup_count:
             issues.append("No coverage groups defined")
             suggestions.append("Add covergroups for functional coverage")
         else:
-            covergroup_count = len(re.findall(r'covergroup\s+\w+', self.testbench_content))
             coverage = min(100.0, covergroup_count * 25.0)  # 25% per covergroup, max 100%
 
         # Check for coverage points
-        if not re.search(r'coverpoint\s+\w+', self.testbench_content):
+        if not self.testbench_probes["coverpoint"]:
             issues.append("No coverage points defined")
             suggestions.append("Add coverage points for state space exploration")
 
@@ -102,16 +189,16 @@ class DesignVerifier:
         suggestions = []
         coverage = 0.0
 
-        # Check for assertions
-        if not re.search(r'assert\s+\w+', self.testbench_content):
+        # Check for assertions; one scan gives both presence and count
+        assertion_count = self.testbench_probes["assert"]
+        if not assertion_count:
             issues.append("No assertions defined")
             suggestions.append("Add assertions for design invariants")
         else:
-            assertion_count = len(re.findall(r'assert\s+\w+', self.testbench_content))
             coverage = min(100.0, assertion_count * 10.0)  # 10% per assertion, max 100%
 
         # Check for temporal assertions
-        if not re.search(r'##\d+|@\(posedge', self.testbench_content):
+        if not self.testbench_probes["temporal"]:
             issues.append("No temporal assertions defined")
             suggestions.append("Add temporal assertions for sequential behavior")
 
@@ -130,8 +217,8 @@ class DesignVerifier:
         coverage = 0.0
 
         # Check statement coverage
-        statements = len(re.findall(r';', self.verilog_content))
-        covered_statements = len(re.findall(r'assert.*?;|if.*?;|else.*?;', self.testbench_content))
+        statements = self.verilog_probes["statement"]
+        covered_statements = self.testbench_probes["cov_stmt"]
         if statements > 0:
             coverage = (covered_statements / statements) * 100.0
 
@@ -140,8 +227,7 @@ class DesignVerifier:
             suggestions.append("Add test cases to improve code coverage")
 
         # Check branch coverage
-        branches = len(re.findall(r'if|case', self.verilog_content))
-        if branches > 0 and not re.search(r'default\s*:', self.verilog_content):
+        if self.verilog_probes["branch"] and not self.verilog_probes["default"]:
             issues.append("Missing default case in case statements")
             suggestions.append("Add default cases for complete branch coverage")
 
@@ -155,6 +241,8 @@ class DesignVerifier:
 
     def verify_all(self) -> Dict[str, Any]:
         """Perform all verifications and return results."""
+        # The checks only read the probe tables, so they run in sequence; the
+        # scans behind them hold the GIL, so a thread pool gains nothing here
         results = {
             "formal": self.verify_formal_properties(),
             "functional": self.verify_functional_coverage(),
@@ -166,50 +254,44 @@ class DesignVerifier:
 
     def generate_verification_report(self, results: Dict[str, VerificationResult]) -> Dict[str, Any]:
         """Generate a detailed verification report."""
-        report = {
-            "summary": {
-                "total_issues": sum(len(r.issues) for r in results.values()),
-                "total_suggestions": sum(len(r.suggestions) for r in results.values()),
-                "average_coverage": sum(r.coverage for r in results.values()) / len(results),
-                "all_passed": all(r.passed for r in results.values())
-            },
-            "verifications": {}
-        }
-
+        # One pass over the results fills in the per-check entries and the totals
+        verifications = {}
+        total_issues = total_suggestions = 0
+        total_coverage = 0.0
+        all_passed = True
         for ver_type, result in results.items():
-            report["verifications"][ver_type] = {
+            verifications[ver_type] = {
                 "passed": result.passed,
                 "coverage": result.coverage,
                 "issues": result.issues,
                 "suggestions": result.suggestions
             }
+            total_issues += len(result.issues)
+            total_suggestions += len(result.suggestions)
+            total_coverage += result.coverage
+            all_passed = all_passed and result.passed
 
-        return report
+        return {
+            "summary": {
+                "total_issues": total_issues,
+                "total_suggestions": total_suggestions,
+                "average_coverage": total_coverage / len(results),
+                "all_passed": all_passed
+            },
+            "verifications": verifications
+        }
 
     def generate_assertions(self) -> str:
         """Generate SystemVerilog assertions based on design analysis."""
         assertions = []
         
         # Generate basic assertions
-        if re.search(r'input.*reset', self.verilog_content):
-            assertions.append("""
-            // Reset assertion
-            property reset_assertion;
-                @(posedge clk) reset |-> ##1 (state == IDLE);
-            endproperty
-            assert property(reset_assertion);
-            """)
+        if self.verilog_probes["reset_input"]:
+            assertions.append(_RESET_ASSERTION)
 
         # Generate pipeline assertions
-        if re.search(r'always\s*@\s*\(posedge\s+clk\)', self.verilog_content):
-            assertions.append("""
-            // Pipeline validity assertion
-            property pipeline_valid;
-                @(posedge clk) disable iff (reset)
-                $stable(valid) |-> ##1 $stable(data);
-            endproperty
-            assert property(pipeline_valid);
-            """)
+        if self.verilog_probes["clk_block"]:
+            assertions.append(_PIPELINE_ASSERTION)
 
         return "\n".join(assertions)
 
@@ -218,27 +300,12 @@ class DesignVerifier:
         coverage_model = []
 
         # Generate state coverage
-        if re.search(r'state', self.verilog_content):
-            coverage_model.append("""
-            covergroup state_coverage;
-                state_cp: coverpoint state {
-                    bins states[] = {[0:$]};
-                    bins transitions[] = ([0:$] => [0:$]);
-                }
-            endgroup
-            """)
+        if self.verilog_probes["state"]:
+            coverage_model.append(_STATE_COVERAGE)
 
         # Generate data coverage
-        if re.search(r'data', self.verilog_content):
-            coverage_model.append("""
-            covergroup data_coverage;
-                data_cp: coverpoint data {
-                    bins zero = {0};
-                    bins small = {[1:10]};
-                    bins large = {[11:$]};
-                }
-            endgroup
-            """)
+        if self.verilog_probes["data"]:
+            coverage_model.append(_DATA_COVERAGE)
 
         return "\n".join(coverage_model)
 
@@ -256,7 +323,7 @@ def main():
 
         # Save verification report
         report_file = Path("test_output/verification_report.json")
-        report_file.write_text(json.dumps(verification_report, indent=2))
+        report_file.write_bytes(dump_json(verification_report))
         logger.info(f"Verification report generated: {report_file}")
 
         # Generate and save assertions
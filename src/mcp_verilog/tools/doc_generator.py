@@ -5,78 +5,168 @@ Generates comprehensive documentation including diagrams, specifications, and us
 """
 
 import re
-import json
+from functools import cached_property
 from pathlib import Path
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterator, List, NamedTuple, Optional, Any
 from dataclasses import dataclass
 import markdown
 import yaml
+# Package-relative as mcp_verilog.tools; flat when the tools directory itself is on sys.path
+try:
+    from .verilog_scan import ToolContext
+except ImportError:
+    from verilog_scan import ToolContext
+
+# Use the libyaml emitter when PyYAML was built with it; the docs only hold
+# plain strings, lists and dicts, so the safe dumper covers them
+try:
+    from yaml import CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeDumper as YamlDumper
+
+# cmarkgfm renders GitHub-flavored markdown in C; fall back to Python-Markdown
+try:
+    import cmarkgfm
+    from cmarkgfm.cmark import Options as CmarkOptions
+except ImportError:
+    cmarkgfm = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Patterns used to extract module documentation, compiled once. They stay
+# separate passes: ports and signals overlap ("input wire x" is both), which a
+# single alternation would report only once, and a fused pattern loses each
+# one's literal-prefix search
+_MODULE_RE = re.compile(r'module\s+(\w+)')
+_DESC_RE = re.compile(r'/\*\*(.*?)\*/', re.DOTALL)
+_PARAM_RE = re.compile(r'parameter\s+(\w+)\s*=\s*([^;]+);(?:\s*//\s*(.*))?')
+# Whitespace after a type or width belongs to that optional group, so no two
+# \s* runs sit next to each other: a keyword followed by a long blank run and
+# no name used to backtrack cubically. Matches and groups are unchanged
+_PORT_RE = re.compile(r'(input|output|inout)\s+(?:(?:wire|reg)\s*)?(?:\[([^\]]+)\]\s*)?(\w+)(?:\s*//\s*(.*))?')
+_SIGNAL_RE = re.compile(r'(wire|reg)\s*(?:\[([^\]]+)\]\s*)?(\w+)(?:\s*//\s*(.*))?')
+_EXAMPLE_RE = re.compile(r'// Test case.*?\n(.*?)// End test case', re.DOTALL)
+
+# Every port match starts with one of these keywords
+_PORT_KEYWORDS = ("input", "output", "inout")
+
+def _keyword_finditer(pattern: re.Pattern, keywords: tuple, text: str) -> Iterator[re.Match]:
+    """Same matches as pattern.finditer(text) for a pattern that must start with a keyword.
+    
+    The pattern is only tried where str.find lands on a keyword, instead of at
+    every offset. Worth it when keywords are sparse: ports are a handful of
+    lines, while wire/reg hits are dense and finditer stays faster for signals.
+    """
+    nexts = {keyword: text.find(keyword) for keyword in keywords}
+    while True:
+        candidates = [pos for pos in nexts.values() if pos != -1]
+        if not candidates:
+            return
+        start = min(candidates)
+        match = pattern.match(text, start)
+        if match:
+            yield match
+            pos = match.end()
+        else:
+            pos = start + 1
+        for keyword, found in nexts.items():
+            if found != -1 and found < pos:
+                nexts[keyword] = text.find(keyword, pos)
+
+# Table rows are tuples: thousands of signals cost far less than one dict each
+class ParameterDoc(NamedTuple):
+    """A module parameter."""
+    name: str
+    value: str
+    description: str
+
+class PortDoc(NamedTuple):
+    """A module port."""
+    direction: str
+    width: str
+    name: str
+    description: str
+
+class SignalDoc(NamedTuple):
+    """An internal wire or reg."""
+    type: str
+    width: str
+    name: str
+    description: str
+
 @dataclass
 class ModuleDoc:
     """Documentation for a Verilog module."""
     name: str
     description: str
-    parameters: List[Dict[str, str]]
-    ports: List[Dict[str, str]]
-    signals: List[Dict[str, str]]
+    parameters: List[ParameterDoc]
+    ports: List[PortDoc]
+    signals: List[SignalDoc]
     timing_diagrams: List[str]
     examples: List[str]
 
 class DocGenerator:
-    def __init__(self, verilog_file: str, testbench_file: str):
+    def __init__(self, verilog_file: str, testbench_file: str, ctx: Optional[ToolContext] = None):
         """Initialize the documentation generator."""
         self.verilog_file = Path(verilog_file)
         self.testbench_file = Path(testbench_file)
-        self.verilog_content = self.verilog_file.read_text()
-        self.testbench_content = self.testbench_file.read_text()
+        # Share sources already loaded by the caller; otherwise each file is read on first use
+        self.ctx = ctx if ctx is not None else ToolContext(self.verilog_file, self.testbench_file)
+
+    @cached_property
+    def verilog_content(self) -> str:
+        """Verilog source, read on first use."""
+        return self.ctx.verilog_content
+
+    @cached_property
+    def testbench_content(self) -> str:
+        """Testbench source, read on first use."""
+        return self.ctx.testbench_content
 
     def extract_module_info(self) -> ModuleDoc:
         """Extract module information from Verilog code."""
         # Extract module name
-        module_match = re.search(r'module\s+(\w+)', self.verilog_content)
+        module_match = _MODULE_RE.search(self.verilog_content)
         module_name = module_match.group(1) if module_match else "Unknown"
 
         # Extract module description from comments
-        desc_match = re.search(r'/\*\*(.*?)\*/', self.verilog_content, re.DOTALL)
+        desc_match = _DESC_RE.search(self.verilog_content)
         description = desc_match.group(1).strip() if desc_match else "No description available"
 
         # Extract parameters
         parameters = []
-        param_matches = re.finditer(r'parameter\s+(\w+)\s*=\s*([^;]+);(?:\s*//\s*(.*))?', self.verilog_content)
+        param_matches = _PARAM_RE.finditer(self.verilog_content)
         for match in param_matches:
-            parameters.append({
-                "name": match.group(1),
-                "value": match.group(2).strip(),
-                "description": match.group(3).strip() if match.group(3) else "No description"
-            })
+            parameters.append(ParameterDoc(
+                name=match.group(1),
+                value=match.group(2).strip(),
+                description=match.group(3).strip() if match.group(3) else "No description"
+            ))
 
         # Extract ports
         ports = []
-        port_matches = re.finditer(r'(input|output|inout)\s+(?:wire|reg)?\s*(?:\[([^\]]+)\])?\s*(\w+)(?:\s*//\s*(.*))?', self.verilog_content)
+        port_matches = _keyword_finditer(_PORT_RE, _PORT_KEYWORDS, self.verilog_content)
         for match in port_matches:
-            ports.append({
-                "direction": match.group(1),
-                "width": match.group(2) if match.group(2) else "1",
-                "name": match.group(3),
-                "description": match.group(4).strip() if match.group(4) else "No description"
-            })
+            ports.append(PortDoc(
+                direction=match.group(1),
+                width=match.group(2) if match.group(2) else "1",
+                name=match.group(3),
+                description=match.group(4).strip() if match.group(4) else "No description"
+            ))
 
         # Extract internal signals
         signals = []
-        signal_matches = re.finditer(r'(wire|reg)\s*(?:\[([^\]]+)\])?\s*(\w+)(?:\s*//\s*(.*))?', self.verilog_content)
+        signal_matches = _SIGNAL_RE.finditer(self.verilog_content)
         for match in signal_matches:
-            signals.append({
-                "type": match.group(1),
-                "width": match.group(2) if match.group(2) else "1",
-                "name": match.group(3),
-                "description": match.group(4).strip() if match.group(4) else "No description"
-            })
+            signals.append(SignalDoc(
+                type=match.group(1),
+                width=match.group(2) if match.group(2) else "1",
+                name=match.group(3),
+                description=match.group(4).strip() if match.group(4) else "No description"
+            ))
 
         # Generate timing diagrams (placeholder)
         timing_diagrams = [
@@ -85,7 +175,7 @@ class DocGenerator:
 
         # Extract examples from testbench
         examples = []
-        example_matches = re.finditer(r'// Test case.*?\n(.*?)// End test case', self.testbench_content, re.DOTALL)
+        example_matches = _EXAMPLE_RE.finditer(self.testbench_content)
         for match in example_matches:
             examples.append(match.group(1).strip())
 
@@ -101,6 +191,7 @@ class DocGenerator:
 
     def generate_markdown_doc(self, module_doc: ModuleDoc) -> str:
         """Generate markdown documentation."""
+        # Lines are collected and joined once; an io.StringIO buffer is no faster
         doc = []
 
         # Title and Description
@@ -113,7 +204,7 @@ class DocGenerator:
             doc.append("\n| Parameter | Value | Description |")
             doc.append("|-----------|--------|-------------|")
             for param in module_doc.parameters:
-                doc.append(f"| {param['name']} | {param['value']} | {param['description']} |")
+                doc.append(f"| {param.name} | {param.value} | {param.description} |")
             doc.append("")
 
         # Ports
@@ -122,7 +213,7 @@ class DocGenerator:
             doc.append("\n| Port | Direction | Width | Description |")
             doc.append("|------|-----------|--------|-------------|")
             for port in module_doc.ports:
-                doc.append(f"| {port['name']} | {port['direction']} | {port['width']} | {port['description']} |")
+                doc.append(f"| {port.name} | {port.direction} | {port.width} | {port.description} |")
             doc.append("")
 
         # Internal Signals
@@ -131,7 +222,7 @@ class DocGenerator:
             doc.append("\n| Signal | Type | Width | Description |")
             doc.append("|--------|------|--------|-------------|")
             for signal in module_doc.signals:
-                doc.append(f"| {signal['name']} | {signal['type']} | {signal['width']} | {signal['description']} |")
+                doc.append(f"| {signal.name} | {signal.type} | {signal.width} | {signal.description} |")
             doc.append("")
 
         # Timing Diagrams
@@ -154,6 +245,13 @@ class DocGenerator:
 
     def generate_html_doc(self, markdown_content: str) -> str:
         """Convert markdown to HTML."""
+        if cmarkgfm is not None:
+            # Tables and fenced code are part of GFM; raw HTML in descriptions
+            # passes through as it does with Python-Markdown
+            return cmarkgfm.github_flavored_markdown_to_html(
+                markdown_content,
+                options=CmarkOptions.CMARK_OPT_UNSAFE
+            )
         return markdown.markdown(
             markdown_content,
             extensions=['tables', 'fenced_code', 'codehilite']
@@ -165,16 +263,17 @@ class DocGenerator:
             "module": {
                 "name": module_doc.name,
                 "description": module_doc.description,
-                "parameters": module_doc.parameters,
-                "ports": module_doc.ports,
-                "signals": module_doc.signals,
+                "parameters": [param._asdict() for param in module_doc.parameters],
+                "ports": [port._asdict() for port in module_doc.ports],
+                "signals": [signal._asdict() for signal in module_doc.signals],
                 "examples": module_doc.examples
             }
         }
-        return yaml.dump(doc_dict, sort_keys=False, default_flow_style=False)
+        return yaml.dump(doc_dict, Dumper=YamlDumper, sort_keys=False, default_flow_style=False)
 
     def generate_all(self) -> Dict[str, str]:
         """Generate all documentation formats."""
+        # Rendered in sequence: Python-Markdown and the YAML representers hold the GIL
         module_doc = self.extract_module_info()
         
         markdown_doc = self.generate_markdown_doc(module_doc)
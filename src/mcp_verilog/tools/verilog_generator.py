@@ -4,15 +4,40 @@ Standalone Verilog Generator - Using DeepSeek Function Calling for enhanced anal
 """
 
 import os
-import json
-import re
+import copy
+import hashlib
 import argparse
 import asyncio
+import collections
+import contextvars
+import functools
+import tempfile
+import threading
+import time
 from pathlib import Path
+from types import SimpleNamespace
 import logging
-from typing import Dict, Any, Optional, Tuple, List
+from typing import Awaitable, Callable, Dict, Any, Optional, Tuple, List
 from dotenv import load_dotenv
+import httpx
 import openai
+# Package-relative as mcp_verilog.tools; flat when the tools directory itself is on sys.path
+try:
+    from .verilog_scan import dump_json, load_json
+except ImportError:
+    from verilog_scan import dump_json, load_json
+
+# jsonschema_rs is optional; without it only required fields are checked
+try:
+    import jsonschema_rs
+except ImportError:
+    jsonschema_rs = None
+
+# uvloop is optional; its libuv event loop drives the many concurrent API connections faster
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 # Load environment variables from .env file
 load_dotenv()
@@ -21,14 +46,188 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Fixed system message sent first on every call. Together with the tool schema it
+# forms an identical prompt prefix that DeepSeek's automatic context caching
+# serves from cache on the later calls of each pipeline
+_SYSTEM_PROMPT = (
+    "You are an expert digital design engineer. Answer every request by calling "
+    "the matching function with Verilog-2001 or SystemVerilog that synthesizes cleanly."
+)
+
+class _LazyJson:
+    """Indented JSON for a log argument, rendered only if the record is emitted."""
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __str__(self) -> str:
+        return dump_json(self.value).decode("utf-8")
+
+# Times a tool call with invalid arguments is sent back to the model for correction
+_TOOL_RETRIES = 1
+
+def _schema_check(schema: Dict[str, Any]) -> Callable[[Any], Optional[str]]:
+    """Build a check returning the first schema violation of a value, or None."""
+    if jsonschema_rs is not None:
+        validator = jsonschema_rs.validator_for(schema)
+        
+        def check(value: Any) -> Optional[str]:
+            error = next(validator.iter_errors(value), None)
+            return error.message if error is not None else None
+        return check
+    
+    required = schema.get("required", ())
+    
+    def check(value: Any) -> Optional[str]:
+        if not isinstance(value, dict):
+            return "arguments must be an object"
+        missing = [key for key in required if key not in value]
+        return f"missing required fields: {', '.join(missing)}" if missing else None
+    return check
+
+# Design plans by description digest; bounded, oldest entry evicted first
+_PLAN_CACHE_SIZE = 64
+
+_MODEL = "deepseek-chat"
+
+# Validated tool-call arguments persisted by request digest, so re-runs with the
+# same prompts skip the API; VERILOG_AGENT_CACHE_DIR moves it
+_CACHE_DIR = Path(os.getenv("VERILOG_AGENT_CACHE_DIR", "~/.verilog_agent/cache")).expanduser()
+# Whether the current generate() run may use the response caches
+_cache_enabled: contextvars.ContextVar[bool] = contextvars.ContextVar("cache_enabled", default=True)
+
+def _load_cached(key: str) -> Optional[Dict[str, Any]]:
+    """Read cached tool arguments, or None when missing or unreadable."""
+    try:
+        return load_json((_CACHE_DIR / f"{key}.json").read_bytes())
+    except (OSError, ValueError):
+        return None
+
+def _store_cached(key: str, arguments: Dict[str, Any]) -> None:
+    """Persist tool arguments; a failed write only costs a cache miss.
+    
+    Each write goes to its own temporary file and is renamed into place, so
+    concurrent writers of the same key never mix and readers never see
+    partial files.
+    """
+    tmp_path = None
+    try:
+        _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=_CACHE_DIR, prefix=f"{key}.", suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(dump_json(arguments, indent=False))
+        os.replace(tmp_path, _CACHE_DIR / f"{key}.json")
+    except OSError as e:
+        logger.warning(f"Could not write cache entry {key}: {str(e)}")
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+# Connection pool of each loop's client, shared by every generator on that loop
+_HTTP_LIMITS = httpx.Limits(max_connections=256, max_keepalive_connections=64)
+_HTTP_TIMEOUT = httpx.Timeout(120.0)
+# Attempts after a 429, 5xx or dropped connection; the SDK backs off exponentially
+# with jitter and honors the server's retry-after header
+_MAX_RETRIES = int(os.getenv("DS_MAX_RETRIES", "5"))
+
+class RateLimiter:
+    """Sliding-window cap on API requests started per minute; 0 disables it."""
+
+    def __init__(self, requests_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self._starts: collections.deque = collections.deque()
+        # Loops in other threads may share the window
+        self._lock = threading.Lock()
+
+    async def __aenter__(self) -> "RateLimiter":
+        if self.requests_per_minute:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    while self._starts and now - self._starts[0] >= 60.0:
+                        self._starts.popleft()
+                    if len(self._starts) < self.requests_per_minute:
+                        self._starts.append(now)
+                        break
+                    delay = 60.0 - (now - self._starts[0])
+                await asyncio.sleep(delay)
+        return self
+
+    async def __aexit__(self, *exc_info) -> bool:
+        return False
+
+# Requests per minute across all generators in the process, so bursts of designs
+# queue here instead of running into the provider's 429s
+_RATE_LIMITER = RateLimiter(int(os.getenv("DS_REQUESTS_PER_MINUTE", "0")))
+# API calls in flight across all generators on a loop; provider limits are per
+# key, so every agent and server request on it shares the one bound
+_MAX_CONCURRENCY = int(os.getenv("DS_MAX_CONCURRENCY", "32"))
+
+# The client's connection pool and the semaphore belong to the loop that first
+# uses them, so each running loop gets its own
+_LOOP_RESOURCES: Dict[asyncio.AbstractEventLoop, SimpleNamespace] = {}
+_LOOP_RESOURCES_LOCK = threading.Lock()
+
+def _loop_resources() -> SimpleNamespace:
+    """DeepSeek client and API semaphore of the running loop, created on first use."""
+    loop = asyncio.get_running_loop()
+    resources = _LOOP_RESOURCES.get(loop)
+    if resources is None:
+        with _LOOP_RESOURCES_LOCK:
+            # Entries of loops that closed without close_shared_client can never be used again
+            for closed in [other for other in _LOOP_RESOURCES if other.is_closed()]:
+                del _LOOP_RESOURCES[closed]
+            resources = _LOOP_RESOURCES[loop] = SimpleNamespace(
+                client=openai.AsyncOpenAI(
+                    api_key=os.getenv('DEEPSEEK_API_KEY'),
+                    base_url="https://api.deepseek.com/v1",
+                    http_client=httpx.AsyncClient(limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT),
+                    max_retries=_MAX_RETRIES
+                ),
+                semaphore=asyncio.Semaphore(_MAX_CONCURRENCY)
+            )
+    return resources
+
+def shared_client() -> openai.AsyncOpenAI:
+    """DeepSeek client reused across generators on the running loop."""
+    return _loop_resources().client
+
+async def close_shared_client() -> None:
+    """Close the running loop's client connections if it ever created them."""
+    with _LOOP_RESOURCES_LOCK:
+        resources = _LOOP_RESOURCES.pop(asyncio.get_running_loop(), None)
+    if resources is not None:
+        await resources.client.close()
+
+def run_event_loop(main: Awaitable[Any]) -> Any:
+    """Run an entry point's coroutine, on uvloop when it is installed."""
+    if uvloop is not None:
+        return uvloop.run(main)
+    return asyncio.run(main)
+
 class VerilogGenerator:
+    # Fixed per-stage instructions, sent ahead of the variable content so calls
+    # of the same stage share a prompt prefix
+    _ANALYZE_SYS = "Analyze this Verilog design description and create a structured design plan."
+    _GENERATE_SYS = "Generate Verilog code for this design plan."
+    _TESTBENCH_SYS = "Generate a SystemVerilog testbench for this Verilog module."
+    _VALIDATE_SYS = "Validate this Verilog code and testbench."
+    _SINGLE_TURN_SYS = (
+        "Handle this Verilog design description in a single reply: call analyze_verilog_design "
+        "with the design plan, generate_verilog_code implementing that plan, generate_testbench "
+        "for that module unless no testbench is wanted, and validate_verilog_code reviewing the "
+        "module and testbench. Emit all of these tool calls at once without waiting for results."
+    )
+    # Tools a single turn must call, in pipeline order
+    _SINGLE_TURN_TOOLS = ("analyze_verilog_design", "generate_verilog_code", "generate_testbench", "validate_verilog_code")
+
     def __init__(self):
         """Initialize the Verilog generator with API configurations."""
-        # Configure DeepSeek
-        self.client = openai.AsyncOpenAI(
-            api_key=os.getenv('DEEPSEEK_API_KEY'),
-            base_url="https://api.deepseek.com/v1"
-        )
+        # Design plans already produced for a description, reused by analyze_design
+        self._plan_cache: Dict[bytes, Dict[str, Any]] = {}
         
         # Define function tools for Verilog generation
         self.tools = [
@@ -256,32 +455,148 @@ class VerilogGenerator:
             }
         ]
 
+    @property
+    def client(self) -> openai.AsyncOpenAI:
+        """DeepSeek client of the running loop; keep-alive connections are shared with other generators."""
+        return shared_client()
+
+    @functools.cached_property
+    def _tool_checks(self) -> Dict[str, Callable[[Any], Optional[str]]]:
+        """Argument checks for each tool, built from the schemas once."""
+        return {
+            tool["function"]["name"]: _schema_check(tool["function"]["parameters"])
+            for tool in self.tools
+        }
+
     async def send_messages(self, messages: List[Dict[str, str]], tools: Optional[List[Dict]] = None) -> Dict:
-        """Send messages to the API and handle function calls."""
+        """Send messages to the API and handle function calls.
+        
+        The response is streamed and its deltas accumulated into a message with
+        the same content/tool_calls shape as a non-streamed one. Data keeps
+        arriving while a large module is decoded, so long generations do not
+        sit idle into the read timeout.
+        """
         try:
-            response = await self.client.chat.completions.create(
-                model="deepseek-chat",
-                messages=messages,
-                tools=tools if tools else self.tools
+            async with _loop_resources().semaphore, _RATE_LIMITER:
+                stream = await self.client.chat.completions.create(
+                    model=_MODEL,
+                    messages=[{"role": "system", "content": _SYSTEM_PROMPT}, *messages],
+                    tools=tools if tools else self.tools,
+                    stream=True
+                )
+                
+                content = []
+                tool_calls: Dict[int, Dict[str, Any]] = {}
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta
+                    if delta.content:
+                        content.append(delta.content)
+                    for call in delta.tool_calls or ():
+                        # Later deltas of a call carry only its index and an arguments fragment
+                        entry = tool_calls.setdefault(call.index, {"id": None, "name": "", "arguments": []})
+                        if call.id:
+                            entry["id"] = call.id
+                        if call.function is not None:
+                            if call.function.name:
+                                entry["name"] += call.function.name
+                            if call.function.arguments:
+                                entry["arguments"].append(call.function.arguments)
+            
+            return SimpleNamespace(
+                content="".join(content) or None,
+                tool_calls=[
+                    SimpleNamespace(
+                        id=entry["id"],
+                        function=SimpleNamespace(name=entry["name"], arguments="".join(entry["arguments"]))
+                    )
+                    for _, entry in sorted(tool_calls.items())
+                ] or None
             )
-            return response.choices[0].message
         except Exception as e:
             logger.error(f"API call failed: {str(e)}")
             raise
 
+    @functools.cached_property
+    def _tools_digest(self) -> bytes:
+        """Digest of the tool schemas, so schema edits invalidate cached responses."""
+        return hashlib.sha256(dump_json(self.tools, indent=False)).digest()
+
+    def _cache_key(self, messages: List[Dict[str, Any]], label: str) -> str:
+        """Response cache key by model, tool schemas, request label and messages."""
+        digest = hashlib.sha256(self._tools_digest)
+        digest.update(f"{_MODEL}\0{label}\0".encode())
+        digest.update(dump_json(messages, indent=False))
+        return digest.hexdigest()
+
+    async def call_tool(self, messages: List[Dict[str, Any]], tool_name: str) -> Optional[Dict[str, Any]]:
+        """Send messages and return the arguments of a valid call to tool_name.
+        
+        Arguments that do not parse or do not match the tool's schema are sent
+        back to the model with the error, up to _TOOL_RETRIES times. Returns None
+        when the model calls no tool, another tool, or never gets it right.
+        Valid arguments are cached on disk by model, tool schemas and messages.
+        """
+        use_cache = _cache_enabled.get()
+        if use_cache:
+            cache_key = self._cache_key(messages, tool_name)
+            cached = await asyncio.to_thread(_load_cached, cache_key)
+            if cached is not None:
+                logger.info(f"Response cache hit for {tool_name}")
+                return cached
+            logger.info(f"Response cache miss for {tool_name}")
+        
+        messages = list(messages)
+        for _ in range(_TOOL_RETRIES + 1):
+            message = await self.send_messages(messages)
+            if not message.tool_calls or message.tool_calls[0].function.name != tool_name:
+                return None
+            
+            tool_call = message.tool_calls[0]
+            try:
+                arguments = load_json(tool_call.function.arguments)
+                error = self._tool_checks[tool_name](arguments)
+            except ValueError as e:
+                error = f"arguments are not valid JSON: {str(e)}"
+            if error is None:
+                if use_cache:
+                    await asyncio.to_thread(_store_cached, cache_key, arguments)
+                return arguments
+            
+            logger.warning(f"Invalid {tool_name} arguments: {error}")
+            messages += [
+                {"role": "assistant", "content": None, "tool_calls": [{
+                    "id": tool_call.id,
+                    "type": "function",
+                    "function": {"name": tool_name, "arguments": tool_call.function.arguments}
+                }]},
+                {"role": "tool", "tool_call_id": tool_call.id,
+                 "content": f"Invalid arguments: {error}. Call {tool_name} again with arguments matching its schema."}
+            ]
+        return None
+
     async def analyze_design(self, description: str) -> Dict[str, Any]:
         """Stage 1: Analyze the design description and create a structured plan."""
         try:
-            messages = [{"role": "user", "content": f"Analyze this Verilog design description and create a structured design plan:\n\n{description}"}]
-            message = await self.send_messages(messages)
+            # The same description is planned once; callers get a copy they may edit
+            key = hashlib.sha256(description.encode()).digest()
+            if key in self._plan_cache and _cache_enabled.get():
+                logger.info("Reusing design plan for an identical description")
+                return copy.deepcopy(self._plan_cache[key])
             
-            if message.tool_calls:
-                tool_call = message.tool_calls[0]
-                if tool_call.function.name == "analyze_verilog_design":
-                    design_plan = json.loads(tool_call.function.arguments)
-                    logger.info(f"Generated design plan for module: {design_plan['module_name']}")
-                    logger.info(f"Design type: {design_plan['design_type']}")
-                    return design_plan
+            messages = [
+                {"role": "system", "content": self._ANALYZE_SYS},
+                {"role": "user", "content": description}
+            ]
+            design_plan = await self.call_tool(messages, "analyze_verilog_design")
+            if design_plan is not None:
+                logger.info(f"Generated design plan for module: {design_plan['module_name']}")
+                logger.info(f"Design type: {design_plan['design_type']}")
+                if len(self._plan_cache) >= _PLAN_CACHE_SIZE:
+                    del self._plan_cache[next(iter(self._plan_cache))]
+                self._plan_cache[key] = copy.deepcopy(design_plan)
+                return design_plan
             
             raise ValueError("No valid design plan generated")
                 
@@ -293,20 +608,14 @@ class VerilogGenerator:
         """Stage 2: Generate Verilog code from the design plan."""
         try:
             messages = [
-                {"role": "user", "content": f"Generate Verilog code for this design plan:\n\n{json.dumps(design_plan, indent=2)}"}
+                {"role": "system", "content": self._GENERATE_SYS},
+                # Compact JSON: the indentation only cost prompt tokens. The name override
+                # means the model's raw arguments cannot be reused in place of this dump
+                {"role": "user", "content": dump_json(design_plan, indent=False).decode("utf-8")}
             ]
-            message = await self.send_messages(messages)
-            
-            if message.tool_calls:
-                tool_call = message.tool_calls[0]
-                if tool_call.function.name == "generate_verilog_code":
-                    result = json.loads(tool_call.function.arguments)
-                    verilog_code = result["module_code"]
-                    logger.info("Implementation details:\n%s", json.dumps(result["implementation_details"], indent=2))
-                    logger.info("Implementation comments:\n%s", "\n".join(result["comments"]))
-                    if result.get("synthesis_guidelines"):
-                        logger.info("Synthesis guidelines:\n%s", "\n".join(result["synthesis_guidelines"]))
-                    return verilog_code
+            result = await self.call_tool(messages, "generate_verilog_code")
+            if result is not None:
+                return self._verilog_from(result)
             
             raise ValueError("No valid Verilog code generated")
             
@@ -318,20 +627,12 @@ class VerilogGenerator:
         """Stage 3: Generate a testbench for the Verilog module."""
         try:
             messages = [
-                {"role": "user", "content": f"Generate a SystemVerilog testbench for this Verilog module:\n\n{verilog_code}"}
+                {"role": "system", "content": self._TESTBENCH_SYS},
+                {"role": "user", "content": verilog_code}
             ]
-            message = await self.send_messages(messages)
-            
-            if message.tool_calls:
-                tool_call = message.tool_calls[0]
-                if tool_call.function.name == "generate_testbench":
-                    result = json.loads(tool_call.function.arguments)
-                    testbench_code = result["testbench_code"]
-                    logger.info("Test scenarios:\n%s", json.dumps(result["test_scenarios"], indent=2))
-                    logger.info("Coverage plan:\n%s", json.dumps(result["coverage_plan"], indent=2))
-                    if result.get("debug_features"):
-                        logger.info("Debug features:\n%s", "\n".join(result["debug_features"]))
-                    return testbench_code
+            result = await self.call_tool(messages, "generate_testbench")
+            if result is not None:
+                return self._testbench_from(result)
             
             raise ValueError("No valid testbench generated")
             
@@ -343,29 +644,12 @@ class VerilogGenerator:
         """Stage 4: Validate the generated code and check for potential issues."""
         try:
             messages = [
-                {"role": "user", "content": f"Validate this Verilog code and testbench:\n\nVerilog:\n{verilog_code}\n\nTestbench:\n{testbench_code if testbench_code else 'None'}"}
+                {"role": "system", "content": self._VALIDATE_SYS},
+                {"role": "user", "content": f"Verilog:\n{verilog_code}\n\nTestbench:\n{testbench_code if testbench_code else 'None'}"}
             ]
-            message = await self.send_messages(messages)
-            
-            if message.tool_calls:
-                tool_call = message.tool_calls[0]
-                if tool_call.function.name == "validate_verilog_code":
-                    result = json.loads(tool_call.function.arguments)
-                    warnings = result["warnings"]
-                    suggestions = result["suggestions"]
-                    metrics = result["verification_metrics"]
-                    
-                    logger.info("Verification metrics:\n%s", json.dumps(metrics, indent=2))
-                    logger.info("Improvement suggestions:\n%s", json.dumps(suggestions, indent=2))
-                    
-                    # Format warnings with severity
-                    formatted_warnings = []
-                    for warning in warnings:
-                        formatted_warnings.append(f"[{warning['severity'].upper()}] {warning['message']} at {warning['location']}")
-                        if warning.get("suggestion"):
-                            formatted_warnings.append(f"  Suggestion: {warning['suggestion']}")
-                    
-                    return formatted_warnings
+            result = await self.call_tool(messages, "validate_verilog_code")
+            if result is not None:
+                return self._warnings_from(result)
             
             return []
             
@@ -373,48 +657,177 @@ class VerilogGenerator:
             logger.error(f"Failed to validate code: {str(e)}")
             return []
 
-    async def generate(self, description: str, output_dir: str, module_name: Optional[str] = None, generate_testbench: bool = False) -> None:
-        """Main generation pipeline that orchestrates all stages."""
+    @staticmethod
+    def _verilog_from(result: Dict[str, Any]) -> str:
+        """Log a generate_verilog_code result and return its module code."""
+        logger.info("Implementation details:\n%s", _LazyJson(result["implementation_details"]))
+        logger.info("Implementation comments:\n%s", "\n".join(result["comments"]))
+        if result.get("synthesis_guidelines"):
+            logger.info("Synthesis guidelines:\n%s", "\n".join(result["synthesis_guidelines"]))
+        return result["module_code"]
+
+    @staticmethod
+    def _testbench_from(result: Dict[str, Any]) -> str:
+        """Log a generate_testbench result and return its testbench code."""
+        logger.info("Test scenarios:\n%s", _LazyJson(result["test_scenarios"]))
+        logger.info("Coverage plan:\n%s", _LazyJson(result["coverage_plan"]))
+        if result.get("debug_features"):
+            logger.info("Debug features:\n%s", "\n".join(result["debug_features"]))
+        return result["testbench_code"]
+
+    @staticmethod
+    def _warnings_from(result: Dict[str, Any]) -> List[str]:
+        """Log a validate_verilog_code result and return its formatted warnings."""
+        logger.info("Verification metrics:\n%s", _LazyJson(result["verification_metrics"]))
+        logger.info("Improvement suggestions:\n%s", _LazyJson(result["suggestions"]))
+        
+        # Format warnings with severity; a plain loop reads better than a chain() comprehension
+        formatted_warnings = []
+        for warning in result["warnings"]:
+            formatted_warnings.append(f"[{warning['severity'].upper()}] {warning['message']} at {warning['location']}")
+            if warning.get("suggestion"):
+                formatted_warnings.append(f"  Suggestion: {warning['suggestion']}")
+        
+        return formatted_warnings
+
+    async def run_single_turn(self, description: str, module_name: Optional[str] = None,
+                              generate_testbench: bool = False) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Run every stage in one API turn and return each tool's arguments by tool name.
+        
+        Returns None when the reply lacks a wanted tool call or any arguments are
+        invalid, for instance when the model stops to wait for tool results;
+        the caller then falls back to one turn per stage.
+        """
+        wanted = [name for name in self._SINGLE_TURN_TOOLS if generate_testbench or name != "generate_testbench"]
+        request = [description]
+        if module_name:
+            request.append(f"Module name: {module_name}")
+        if not generate_testbench:
+            request.append("No testbench is wanted.")
+        messages = [
+            {"role": "system", "content": self._SINGLE_TURN_SYS},
+            {"role": "user", "content": "\n\n".join(request)}
+        ]
+        
+        use_cache = _cache_enabled.get()
+        if use_cache:
+            cache_key = self._cache_key(messages, "single_turn")
+            cached = await asyncio.to_thread(_load_cached, cache_key)
+            if cached is not None:
+                logger.info("Response cache hit for single turn")
+                return cached
+        
+        message = await self.send_messages(messages)
+        results = {}
+        for tool_call in message.tool_calls or ():
+            name = tool_call.function.name
+            if name not in wanted or name in results:
+                continue
+            try:
+                arguments = load_json(tool_call.function.arguments)
+                error = self._tool_checks[name](arguments)
+            except ValueError as e:
+                error = f"arguments are not valid JSON: {str(e)}"
+            if error is not None:
+                logger.info(f"Single turn returned invalid {name} arguments ({error}); running stages separately")
+                return None
+            results[name] = arguments
+        
+        missing = [name for name in wanted if name not in results]
+        if missing:
+            logger.info(f"Single turn skipped {', '.join(missing)}; running stages separately")
+            return None
+        if use_cache:
+            await asyncio.to_thread(_store_cached, cache_key, results)
+        return results
+
+    async def generate(self, description: str, output_dir: str, module_name: Optional[str] = None, generate_testbench: bool = False,
+                       use_cache: bool = True, single_turn: bool = False) -> Dict[str, Optional[Path]]:
+        """Main generation pipeline that orchestrates all stages.
+        
+        With single_turn, all stages are first requested in one API turn; when the
+        model does not deliver every tool call, each stage gets its own turn.
+        Returns the "verilog" and "testbench" paths written, the latter None
+        without generate_testbench.
+        """
+        # Stages may answer from the response caches unless this run opted out
+        cache_token = _cache_enabled.set(use_cache)
+        module_write = testbench_write = None
         try:
-            # Create output directory if it doesn't exist
+            # Create output directory if it doesn't exist, off the event loop
             output_path = Path(output_dir)
-            output_path.mkdir(parents=True, exist_ok=True)
-            
-            # Stage 1: Design Analysis
-            design_plan = await self.analyze_design(description)
+            await asyncio.to_thread(output_path.mkdir, parents=True, exist_ok=True)
             
-            # Override module name if specified
-            if module_name:
-                design_plan['module_name'] = module_name
+            # Stages 1-4 in one round trip, sharing a single prompt prefix
+            results = await self.run_single_turn(description, module_name, generate_testbench) if single_turn else None
             
-            # Stage 2: Code Generation
-            verilog_code = await self.generate_verilog(design_plan)
+            testbench_code = testbench_file = None
+            if results is not None:
+                design_plan = results["analyze_verilog_design"]
+                logger.info(f"Generated design plan for module: {design_plan['module_name']}")
+                logger.info(f"Design type: {design_plan['design_type']}")
+                if module_name:
+                    design_plan['module_name'] = module_name
+                
+                verilog_code = self._verilog_from(results["generate_verilog_code"])
+                module_file = output_path / f"{design_plan['module_name']}.v"
+                module_write = asyncio.create_task(asyncio.to_thread(module_file.write_text, verilog_code))
+                
+                if generate_testbench:
+                    testbench_code = self._testbench_from(results["generate_testbench"])
+                    testbench_file = output_path / f"{design_plan['module_name']}_tb.sv"
+                    testbench_write = asyncio.create_task(asyncio.to_thread(testbench_file.write_text, testbench_code))
+                
+                warnings = self._warnings_from(results["validate_verilog_code"])
+            else:
+                # Stage 1: Design Analysis
+                design_plan = await self.analyze_design(description)
+                
+                # Override module name if specified
+                if module_name:
+                    design_plan['module_name'] = module_name
+                
+                # Stage 2: Code Generation
+                verilog_code = await self.generate_verilog(design_plan)
+                
+                # Write Verilog module in a worker thread while the next stage waits on the API
+                module_file = output_path / f"{design_plan['module_name']}.v"
+                module_write = asyncio.create_task(asyncio.to_thread(module_file.write_text, verilog_code))
+                
+                # Stage 3: Testbench Generation (if requested)
+                if generate_testbench:
+                    testbench_code = await self.generate_testbench(verilog_code, design_plan['module_name'])
+                    testbench_file = output_path / f"{design_plan['module_name']}_tb.sv"
+                    testbench_write = asyncio.create_task(asyncio.to_thread(testbench_file.write_text, testbench_code))
+                
+                # Stage 4: Quality Assurance; validation reviews the testbench too, so it
+                # stays after stage 3 and only the file writes overlap the API calls
+                warnings = await self.validate_code(verilog_code, testbench_code)
             
-            # Write Verilog module
-            module_file = output_path / f"{design_plan['module_name']}.v"
-            module_file.write_text(verilog_code)
+            await module_write
             logger.info(f"Verilog module written to: {module_file}")
-            
-            # Stage 3: Testbench Generation (if requested)
-            testbench_code = None
-            if generate_testbench:
-                testbench_code = await self.generate_testbench(verilog_code, design_plan['module_name'])
-                testbench_file = output_path / f"{design_plan['module_name']}_tb.sv"
-                testbench_file.write_text(testbench_code)
+            if testbench_write is not None:
+                await testbench_write
                 logger.info(f"Testbench written to: {testbench_file}")
             
-            # Stage 4: Quality Assurance
-            warnings = await self.validate_code(verilog_code, testbench_code)
             if warnings:
                 warnings_file = output_path / f"{design_plan['module_name']}_warnings.txt"
-                warnings_file.write_text("\n".join(warnings))
+                await asyncio.to_thread(warnings_file.write_text, "\n".join(warnings))
                 logger.info(f"Warnings written to: {warnings_file}")
             
             logger.info("Generation completed successfully!")
+            return {"verilog": module_file, "testbench": testbench_file}
             
         except Exception as e:
             logger.error(f"Generation failed: {str(e)}")
             raise
+        finally:
+            # Settle the file writes a failed stage left running, so none outlives
+            # the call or leaves its exception unretrieved
+            writes = [task for task in (module_write, testbench_write) if task is not None]
+            if writes:
+                await asyncio.gather(*writes, return_exceptions=True)
+            _cache_enabled.reset(cache_token)
 
 async def main():
     """Main entry point for the Verilog generator."""
@@ -424,6 +837,8 @@ async def main():
     parser.add_argument('-o', '--output', required=True, help='Output directory')
     parser.add_argument('-m', '--module-name', help='Specify module name')
     parser.add_argument('-t', '--testbench', action='store_true', help='Generate testbench')
+    parser.add_argument('--no-cache', action='store_true', help='Ignore cached API responses')
+    parser.add_argument('--single-turn', action='store_true', help='Request all stages in one API turn first')
     
     args = parser.parse_args()
     
@@ -440,8 +855,10 @@ async def main():
         description=description,
         output_dir=args.output,
         module_name=args.module_name,
-        generate_testbench=args.testbench
+        generate_testbench=args.testbench,
+        use_cache=not args.no_cache,
+        single_turn=args.single_turn
     )
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    run_event_loop(main()) 
\ No newline at end of file
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Source Loading and Probe Scanning for Verilog Tools
+Reads source files once, runs a table of regex probes over them and
+serializes the resulting reports.
+"""
+
+import functools
+import itertools
+import mmap
+import os
+import re
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Union
+
+# orjson is optional; fall back to the standard library when it is missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    import json
+
+# A probe is a compiled pattern or a plain literal
+Probe = Union[re.Pattern, str, bytes]
+
+# Names of probes to count, or a dict of names to count limits
+Counted = Union[Iterable[str], Dict[str, Optional[int]]]
+
+# Large enough to pull most generated designs in with a single read call
+READ_BUFFER_SIZE = 1 << 17
+
+# Files above this size are scanned from a mapping instead of a decoded string
+MMAP_THRESHOLD = 64 * 1024
+
+@functools.lru_cache(maxsize=8)
+def _read_cached(path: str, mtime_ns: int, size: int) -> str:
+    """Read a file; the stat fields only serve as the cache key."""
+    with open(path, "rb", buffering=READ_BUFFER_SIZE) as f:
+        text = f.read().decode("utf-8")
+    # Match the newline translation text mode would have applied
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+# Sources are kept as str, since the tools emit str output; large files are
+# scanned as bytes through mapped_source() instead
+def read_source(path: Union[str, Path]) -> str:
+    """Read a source file, reusing the last read while the file is unchanged."""
+    stat = os.stat(path)
+    return _read_cached(os.fspath(path), stat.st_mtime_ns, stat.st_size)
+
+@contextmanager
+def mapped_source(path: Union[str, Path]) -> Iterator[mmap.mmap]:
+    """Map a source file read-only for the duration of the block."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        yield mapped
+
+@functools.lru_cache(maxsize=256)
+def _byte_pattern(pattern: str) -> re.Pattern:
+    """Compile the bytes version of an ASCII pattern once per process."""
+    return re.compile(pattern.encode("ascii"), re.ASCII)
+
+def byte_probes(probes: Dict[str, Probe]) -> Dict[str, Probe]:
+    """Bytes versions of ASCII probes for scanning mapped files."""
+    return {
+        name: (probe.encode("ascii") if isinstance(probe, str) else _byte_pattern(probe.pattern))
+        for name, probe in probes.items()
+    }
+
+def scan_probes(text: Union[str, bytes, mmap.mmap], probes: Dict[str, Probe], counted: Counted = ()) -> Dict[str, int]:
+    """Run every probe over text, or a bytes-like view with byte probes, once.
+
+    Probes named in counted map to their number of matches; all others map to
+    1 if the probe matches anywhere and 0 otherwise. When counted is a dict,
+    a pattern's count stops at its limit (None for no limit). Plain string
+    probes are matched literally without the regex engine.
+    """
+    limits = counted if isinstance(counted, dict) else {}
+    counted = frozenset(counted)
+    results = {}
+    for name, probe in probes.items():
+        if isinstance(probe, (str, bytes)):
+            if name in counted:
+                # mmap has no count(), so count over a bytes copy of the mapping
+                results[name] = (text[:] if isinstance(text, mmap.mmap) else text).count(probe)
+            else:
+                results[name] = 1 if text.find(probe) != -1 else 0
+        elif name in counted:
+            limit = limits.get(name)
+            if limit is None:
+                # findall builds the match list in C, without a Match object per hit
+                results[name] = len(probe.findall(text))
+            else:
+                # Stop scanning once further matches cannot change the result
+                results[name] = sum(1 for _ in itertools.islice(probe.finditer(text), limit))
+        else:
+            results[name] = 1 if probe.search(text) else 0
+    return results
+
+# Callers write the bytes with Path.write_bytes: a buffered writer hands writes
+# larger than its buffer straight to the OS, so a raw os.write saves no copy,
+# and it would need a retry loop for short writes
+def _json_default(obj: Any) -> str:
+    """Serialize the paths that agent results carry as strings."""
+    if isinstance(obj, os.PathLike):
+        return os.fspath(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dump_json(obj: Any, indent: bool = True) -> bytes:
+    """Serialize a report as UTF-8 JSON, indented unless indent is False."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_json_default, option=orjson.OPT_INDENT_2 if indent else None)
+    if indent:
+        return json.dumps(obj, indent=2, default=_json_default).encode("utf-8")
+    return json.dumps(obj, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+def load_json(data: Union[str, bytes]) -> Any:
+    """Parse JSON text, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+class ToolContext:
+    """Sources of one design, read on first use and shared by the tools analyzing it."""
+
+    def __init__(self, verilog_file: Union[str, Path], testbench_file: Optional[Union[str, Path]] = None,
+                 verilog_content: Optional[str] = None, testbench_content: Optional[str] = None):
+        self.verilog_file = Path(verilog_file)
+        self.testbench_file = Path(testbench_file) if testbench_file is not None else None
+        self._verilog_content = verilog_content
+        self._testbench_content = testbench_content
+        self.scans: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def verilog_content(self) -> str:
+        """Design source, read on first access."""
+        if self._verilog_content is None:
+            self._verilog_content = read_source(self.verilog_file)
+        return self._verilog_content
+
+    @property
+    def testbench_content(self) -> str:
+        """Testbench source, read on first access; empty when there is no testbench."""
+        if self._testbench_content is None:
+            self._testbench_content = read_source(self.testbench_file) if self.testbench_file is not None else ""
+        return self._testbench_content
+
+    def scan(self, name: str, source: str, probes: Dict[str, Probe], counted: Counted = ()) -> Dict[str, int]:
+        """Run a named probe table over the "verilog" or "testbench" source once per context.
+        
+        A large file that has not been loaded yet is scanned from a read-only
+        mapping with byte versions of the probes instead of being decoded.
+        """
+        if name not in self.scans:
+            if source == "verilog":
+                path, loaded = self.verilog_file, self._verilog_content
+            else:
+                path, loaded = self.testbench_file, self._testbench_content
+            
+            if loaded is None and path is not None and os.stat(path).st_size > MMAP_THRESHOLD:
+                with mapped_source(path) as mapped:
+                    self.scans[name] = scan_probes(mapped, byte_probes(probes), counted)
+            else:
+                self.scans[name] = scan_probes(getattr(self, f"{source}_content"), probes, counted)
+        return self.scans[name]
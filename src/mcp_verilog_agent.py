@@ -5,132 +5,307 @@ Integrates the Verilog AI Agent with the Mission Control Protocol server.
 """
 
 import asyncio
+import atexit
 import logging
+import os
+import queue
+import time
+import uuid
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from typing import Dict, Any, Optional
-from fastapi import FastAPI, HTTPException
+from typing import Dict, Any, List, Optional, Set
+from fastapi import FastAPI, HTTPException, Query, Response
 from pydantic import BaseModel
 from verilog_ai_agent import VerilogAIAgent
+from verilog_scan import ToolContext, dump_json
+from verilog_generator import close_shared_client, run_event_loop
 
-# Configure logging
+# Configure logging; records are written by a background listener thread, and
+# force replaces the handlers the imported tool modules already installed
+log_handler = logging.StreamHandler()
+log_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, log_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    format='%(message)s',
+    handlers=[QueueHandler(log_queue)],
+    force=True
 )
 logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
 app = FastAPI(title="MCP Verilog Agent", version="1.0.0")
 
+# Root of everything the server writes
+_OUTPUT_ROOT = Path("mcp_output")
+
 # Initialize Verilog AI Agent
-verilog_agent = VerilogAIAgent(output_dir="mcp_output")
+verilog_agent = VerilogAIAgent(output_dir=str(_OUTPUT_ROOT))
+
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    """Release pooled API connections"""
+    await close_shared_client()
 
 class DesignRequest(BaseModel):
     """Request model for design generation"""
     description: str
     module_name: Optional[str] = None
+    cache: bool = True
 
 class DesignResponse(BaseModel):
     """Response model for design generation"""
     files: Dict[str, Any]
     reports: Dict[str, Any]
 
+class BatchRequest(BaseModel):
+    """Request model for bulk design generation"""
+    designs: List[DesignRequest]
+
+# Finished jobs stay pollable this long, and at most this many are kept per kind
+_JOB_TTL = float(os.getenv("JOB_TTL_SECONDS", "3600"))
+_MAX_FINISHED_JOBS = 256
+
+# Bulk generation jobs by id, polled through /design/batch/{batch_id}
+batch_jobs: Dict[str, Dict[str, Any]] = {}
+# Single-design jobs started with ?async=true, polled through /design/{design_id}/status
+design_jobs: Dict[str, Dict[str, Any]] = {}
+# Running background tasks, referenced until they finish
+_background_tasks: Set[asyncio.Task] = set()
+
+def _start_background(coro) -> None:
+    """Run a job coroutine after the response is sent, keeping its task referenced"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+def _finish_job(job: Dict[str, Any], status: str) -> None:
+    """Mark a job completed or failed, starting its TTL"""
+    job["status"] = status
+    job["finished_at"] = time.time()
+
+def _prune_jobs(jobs: Dict[str, Dict[str, Any]]) -> None:
+    """Drop finished jobs past their TTL, then the oldest beyond the size bound"""
+    finished = sorted(
+        (job["finished_at"], job_id) for job_id, job in jobs.items() if "finished_at" in job
+    )
+    cutoff = time.time() - _JOB_TTL
+    expired = sum(1 for finished_at, _ in finished if finished_at < cutoff)
+    expired = max(expired, len(finished) - _MAX_FINISHED_JOBS)
+    for _, job_id in finished[:expired]:
+        del jobs[job_id]
+
+def _json_response(content: Dict[str, Any], status_code: int = 200) -> Response:
+    """Serialize a result straight to JSON.
+    
+    Returning a Response skips FastAPI's jsonable_encoder walk and response
+    model validation over the generated sources; response_model still
+    documents the shape.
+    """
+    return Response(content=dump_json(content, indent=False), media_type="application/json",
+                    status_code=status_code)
+
+def _request_context(verilog_code: str, testbench: Optional[str] = None) -> ToolContext:
+    """Hand posted sources to the agent in memory.
+    
+    The paths are never read or written; their unique stem only names the
+    files the agent saves, so concurrent requests never collide and each
+    request's outputs can be removed once they are returned.
+    """
+    stem = f"request_{uuid.uuid4().hex}"
+    return ToolContext(
+        verilog_file=_OUTPUT_ROOT / f"{stem}.v",
+        testbench_file=_OUTPUT_ROOT / f"{stem}_tb.sv" if testbench is not None else None,
+        verilog_content=verilog_code,
+        testbench_content=testbench
+    )
+
+def _collect_outputs(results: Dict[str, Any], stem: str) -> Dict[str, Any]:
+    """Return results with each file written for the request replaced by its text
+    
+    An "optimized_file" entry becomes "optimized", and so on, so the client
+    keeps the outputs that _remove_outputs deletes.
+    """
+    collected = {}
+    for key, value in results.items():
+        if isinstance(value, Path) and value.name.startswith(stem):
+            collected[key.removesuffix("_file")] = value.read_text(encoding="utf-8")
+        else:
+            collected[key] = value
+    return collected
+
+def _remove_outputs(stem: str) -> None:
+    """Delete every file the agent wrote for one request"""
+    for path in _OUTPUT_ROOT.glob(f"{stem}*"):
+        path.unlink(missing_ok=True)
+
+def _read_design_files(design_dir: Path) -> Optional[Dict[str, str]]:
+    """Read every file of a design directory by name, or None when it does not exist"""
+    # scandir entries carry their file type, so listing builds no Path per entry
+    try:
+        entries = [entry for entry in os.scandir(design_dir) if entry.is_file()]
+    except FileNotFoundError:
+        return None
+    files = {}
+    for entry in entries:
+        with open(entry.path) as f:
+            files[entry.name] = f.read()
+    return files
+
+async def _run_batch(batch_id: str, designs: List[DesignRequest]) -> None:
+    """Run a bulk job through the agent's generation/analysis pipeline"""
+    job = batch_jobs[batch_id]
+    try:
+        job["results"] = await verilog_agent.process_designs(
+            [(design.description, design.module_name, design.cache) for design in designs]
+        )
+        _finish_job(job, "completed")
+    except Exception as e:
+        logger.error(f"Batch {batch_id} failed: {str(e)}")
+        job["error"] = str(e)
+        _finish_job(job, "failed")
+
+async def _run_design(design_id: str, request: DesignRequest) -> None:
+    """Run a single background design through the agent's pipeline"""
+    job = design_jobs[design_id]
+    try:
+        job["results"] = await verilog_agent.process_design(
+            description=request.description,
+            module_name=request.module_name,
+            use_cache=request.cache
+        )
+        _finish_job(job, "completed")
+    except Exception as e:
+        logger.error(f"Design {design_id} failed: {str(e)}")
+        job["error"] = str(e)
+        _finish_job(job, "failed")
+
 @app.post("/design/generate", response_model=DesignResponse)
-async def generate_design(request: DesignRequest) -> Dict[str, Any]:
-    """Generate a complete Verilog design using the AI Agent"""
+async def generate_design(request: DesignRequest,
+                          run_async: bool = Query(False, alias="async")) -> Response:
+    """Generate a complete Verilog design using the AI Agent
+    
+    With ?async=true the design runs in the background and the response is a
+    202 with the id to poll at /design/{design_id}/status.
+    """
+    if run_async:
+        _prune_jobs(design_jobs)
+        design_id = uuid.uuid4().hex
+        design_jobs[design_id] = {"status": "running"}
+        _start_background(_run_design(design_id, request))
+        return _json_response({
+            "design_id": design_id,
+            "status": "running",
+            "status_url": f"/design/{design_id}/status"
+        }, status_code=202)
+    
     try:
         results = await verilog_agent.process_design(
             description=request.description,
-            module_name=request.module_name
+            module_name=request.module_name,
+            use_cache=request.cache
         )
-        return results
+        return _json_response(results)
     except Exception as e:
         logger.error(f"Design generation failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/design/generate_batch")
+async def generate_design_batch(request: BatchRequest) -> Dict[str, Any]:
+    """Queue many designs for background generation and return a batch id to poll"""
+    _prune_jobs(batch_jobs)
+    batch_id = uuid.uuid4().hex
+    batch_jobs[batch_id] = {"status": "running", "total": len(request.designs)}
+    
+    _start_background(_run_batch(batch_id, request.designs))
+    
+    return {"batch_id": batch_id, "status": "running"}
+
+@app.get("/design/batch/{batch_id}")
+async def get_design_batch(batch_id: str) -> Response:
+    """Report the status, and once completed the results, of a bulk job"""
+    job = batch_jobs.get(batch_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return _json_response({"batch_id": batch_id, **job})
+
+@app.get("/design/{design_id}/status")
+async def get_design_status(design_id: str) -> Response:
+    """Report the status, and once completed the results, of a background design"""
+    job = design_jobs.get(design_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Design job not found")
+    return _json_response({"design_id": design_id, **job})
+
 @app.get("/design/{design_id}")
-async def get_design(design_id: str) -> Dict[str, Any]:
+async def get_design(design_id: str) -> Response:
     """Retrieve a previously generated design"""
     try:
-        design_dir = Path("mcp_output") / design_id
-        if not design_dir.exists():
+        # List and read all relevant files in one worker thread
+        files = await asyncio.to_thread(_read_design_files, _OUTPUT_ROOT / design_id)
+        if files is None:
             raise HTTPException(status_code=404, detail="Design not found")
         
-        # Read all relevant files
-        files = {}
-        for file_path in design_dir.glob("*"):
-            if file_path.is_file():
-                files[file_path.name] = file_path.read_text()
-        
-        return {
+        return _json_response({
             "design_id": design_id,
             "files": files
-        }
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to retrieve design: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/design/optimize")
-async def optimize_design(verilog_code: str) -> Dict[str, Any]:
+async def optimize_design(verilog_code: str) -> Response:
     """Optimize an existing Verilog design"""
     try:
-        # Save the code temporarily
-        temp_file = Path("mcp_output") / "temp.v"
-        temp_file.write_text(verilog_code)
-        
-        # Optimize the design
-        optimization_results = verilog_agent.optimize_design(temp_file)
-        
-        # Clean up
-        temp_file.unlink()
-        
-        return optimization_results
+        # Optimize the design straight from the posted code
+        ctx = _request_context(verilog_code)
+        stem = ctx.verilog_file.stem
+        try:
+            results = await verilog_agent.optimize_design(ctx.verilog_file, ctx.verilog_content)
+            return _json_response(await asyncio.to_thread(_collect_outputs, results, stem))
+        finally:
+            # Nothing written for this request is left behind
+            await asyncio.to_thread(_remove_outputs, stem)
     except Exception as e:
         logger.error(f"Design optimization failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/design/verify")
-async def verify_design(verilog_code: str, testbench: str) -> Dict[str, Any]:
+async def verify_design(verilog_code: str, testbench: str) -> Response:
     """Verify a Verilog design"""
     try:
-        # Save the files temporarily
-        temp_verilog = Path("mcp_output") / "temp.v"
-        temp_tb = Path("mcp_output") / "temp_tb.sv"
-        
-        temp_verilog.write_text(verilog_code)
-        temp_tb.write_text(testbench)
-        
-        # Verify the design
-        verification_results = verilog_agent.verify_design(temp_verilog, temp_tb)
-        
-        # Clean up
-        temp_verilog.unlink()
-        temp_tb.unlink()
-        
-        return verification_results
+        # Verify the design straight from the posted sources
+        ctx = _request_context(verilog_code, testbench)
+        stem = ctx.verilog_file.stem
+        try:
+            results = await verilog_agent.verify_design(ctx.verilog_file, ctx.testbench_file, ctx)
+            return _json_response(await asyncio.to_thread(_collect_outputs, results, stem))
+        finally:
+            # Nothing written for this request is left behind
+            await asyncio.to_thread(_remove_outputs, stem)
     except Exception as e:
         logger.error(f"Design verification failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/design/document")
-async def generate_documentation(verilog_code: str, testbench: str) -> Dict[str, Any]:
+async def generate_documentation(verilog_code: str, testbench: str) -> Response:
     """Generate documentation for a Verilog design"""
     try:
-        # Save the files temporarily
-        temp_verilog = Path("mcp_output") / "temp.v"
-        temp_tb = Path("mcp_output") / "temp_tb.sv"
-        
-        temp_verilog.write_text(verilog_code)
-        temp_tb.write_text(testbench)
-        
-        # Generate documentation
-        doc_results = verilog_agent.generate_documentation(temp_verilog, temp_tb)
-        
-        # Clean up
-        temp_verilog.unlink()
-        temp_tb.unlink()
-        
-        return doc_results
+        # Generate documentation straight from the posted sources
+        ctx = _request_context(verilog_code, testbench)
+        stem = ctx.verilog_file.stem
+        try:
+            results = await verilog_agent.generate_documentation(ctx.verilog_file, ctx.testbench_file, ctx)
+            return _json_response(await asyncio.to_thread(_collect_outputs, results, stem))
+        finally:
+            # Nothing written for this request is left behind
+            await asyncio.to_thread(_remove_outputs, stem)
     except Exception as e:
         logger.error(f"Documentation generation failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -138,7 +313,9 @@ async def generate_documentation(verilog_code: str, testbench: str) -> Dict[str,
 async def main():
     """Main entry point for the MCP Verilog Agent server"""
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Serve on the running loop; uvicorn.run would try to start a second one
+    server = uvicorn.Server(uvicorn.Config(app, host="0.0.0.0", port=8000))
+    await server.serve()
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    run_event_loop(main()) 
\ No newline at end of file
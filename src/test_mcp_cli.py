@@ -1,36 +1,65 @@
 import asyncio
+import atexit
 import json
 import logging
-from pathlib import Path
 import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
 from dotenv import load_dotenv
 import subprocess
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
+# Configure logging; DEBUG output is opt-in via LOG_LEVEL=DEBUG and records
+# are written by a background listener thread
+log_handlers = [
+    logging.FileHandler('test_cli_debug.log', delay=True),
+    logging.StreamHandler()
+]
+for handler in log_handlers:
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, *log_handlers)
+log_listener.start()
+atexit.register(log_listener.stop)
 logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('test_cli_debug.log'),
-        logging.StreamHandler()
-    ]
+    level=getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO),
+    format='%(message)s',
+    handlers=[QueueHandler(log_queue)]
 )
 logger = logging.getLogger(__name__)
 
-def run_mcp_command(command):
-    """Run an MCP CLI command and return the output"""
+def run_mcp_command(*args, output_file=None):
+    """Run an MCP CLI command and return the output
+    
+    With output_file the command's stdout is redirected into that file, so
+    the output is saved without passing through a pipe.
+    """
     try:
-        result = subprocess.run(
-            command,
-            shell=True,
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        return result.stdout
+        # Exec the CLI directly from an argv list; no /bin/sh is forked to parse it.
+        # capture_output drains stdout and stderr together through communicate(),
+        # so outputs far past the 64 KB pipe buffer neither stall nor need a spool file
+        if output_file is None:
+            result = subprocess.run(
+                ["mcp", *args],
+                capture_output=True,
+                text=True,
+                check=True
+            )
+            return result.stdout
+        
+        # The child writes straight into the artifact; only stderr is piped
+        with open(output_file, "wb") as f:
+            subprocess.run(
+                ["mcp", *args],
+                stdout=f,
+                stderr=subprocess.PIPE,
+                text=True,
+                check=True
+            )
+        return Path(output_file).read_text()
     except subprocess.CalledProcessError as e:
         logger.error(f"Command failed: {e.stderr}")
         raise
@@ -38,6 +67,15 @@ def run_mcp_command(command):
 def test_mcp_tools():
     """Test MCP CLI tools"""
     try:
+        # Artifacts are written straight into the output directory, so nothing
+        # has to be moved there afterwards
+        output_dir = Path("test_output")
+        output_dir.mkdir(exist_ok=True)
+        desc_file = output_dir / "design_desc.txt"
+        spec_file = output_dir / "design_spec.json"
+        verilog_file = output_dir / "counter_4bit.v"
+        testbench_file = output_dir / "counter_4bit_tb.sv"
+        
         # Test design analysis
         logger.info("Testing design analysis...")
         design_desc = """
@@ -51,75 +89,40 @@ def test_mcp_tools():
         """
         
         # Save design description to a file
-        with open("design_desc.txt", "w") as f:
-            f.write(design_desc)
-        
-        # Run design analysis
-        design_spec = run_mcp_command("mcp analyze_design design_desc.txt")
-        logger.info("Design analysis result:")
-        logger.info(design_spec)
+        desc_file.write_text(design_desc)
         
-        # Save design spec
-        with open("design_spec.json", "w") as f:
-            f.write(design_spec)
+        # Run design analysis; each tool output is saved by run_mcp_command and
+        # only logged with LOG_LEVEL=DEBUG
+        design_spec = run_mcp_command("analyze_design", str(desc_file), output_file=spec_file)
+        logger.debug("Design analysis result:")
+        logger.debug(design_spec)
         
         # Test code generation
         logger.info("Testing code generation...")
-        verilog_code = run_mcp_command("mcp generate_verilog design_spec.json")
-        logger.info("Generated Verilog code:")
-        logger.info(verilog_code)
-        
-        # Save Verilog code
-        with open("counter_4bit.v", "w") as f:
-            f.write(verilog_code)
+        verilog_code = run_mcp_command("generate_verilog", str(spec_file), output_file=verilog_file)
+        logger.debug("Generated Verilog code:")
+        logger.debug(verilog_code)
         
         # Test testbench generation
         logger.info("Testing testbench generation...")
-        testbench = run_mcp_command("mcp generate_testbench counter_4bit design_spec.json")
-        logger.info("Generated testbench:")
-        logger.info(testbench)
-        
-        # Save testbench
-        with open("counter_4bit_tb.sv", "w") as f:
-            f.write(testbench)
+        testbench = run_mcp_command("generate_testbench", "counter_4bit", str(spec_file),
+                                    output_file=testbench_file)
+        logger.debug("Generated testbench:")
+        logger.debug(testbench)
         
         # Test optimization
         logger.info("Testing optimization...")
-        optimized_code = run_mcp_command("mcp optimize_design counter_4bit.v --target area")
-        logger.info("Optimized code:")
-        logger.info(optimized_code)
-        
-        # Save optimized code
-        with open("counter_4bit_optimized.v", "w") as f:
-            f.write(optimized_code)
+        optimized_code = run_mcp_command("optimize_design", str(verilog_file), "--target", "area",
+                                         output_file=output_dir / "counter_4bit_optimized.v")
+        logger.debug("Optimized code:")
+        logger.debug(optimized_code)
         
         # Test verification
         logger.info("Testing verification...")
-        verification_result = run_mcp_command("mcp verify_design counter_4bit.v counter_4bit_tb.sv")
-        logger.info("Verification result:")
-        logger.info(verification_result)
-        
-        # Save verification result
-        with open("verification_result.json", "w") as f:
-            f.write(verification_result)
-        
-        # Create output directory and move files
-        output_dir = Path("test_output")
-        output_dir.mkdir(exist_ok=True)
-        
-        # Move all generated files to output directory
-        files_to_move = [
-            "design_desc.txt",
-            "design_spec.json",
-            "counter_4bit.v",
-            "counter_4bit_tb.sv",
-            "counter_4bit_optimized.v",
-            "verification_result.json"
-        ]
-        
-        for file in files_to_move:
-            if os.path.exists(file):
-                os.rename(file, output_dir / file)
+        verification_result = run_mcp_command("verify_design", str(verilog_file), str(testbench_file),
+                                              output_file=output_dir / "verification_result.json")
+        logger.debug("Verification result:")
+        logger.debug(verification_result)
         
         logger.info("All tests completed successfully!")
         
@@ -1,29 +1,42 @@
 import asyncio
+import atexit
+import functools
 import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from mcp_client import (
-    generate_verilog_design,
-    debug_design,
-    optimize_design,
-    analyze_syntax,
-    analyze_simulation,
-    analyze_synthesis,
-    analyze_formal_verification
-)
 
-# Configure logging
+# Configure logging; DEBUG output is opt-in via LOG_LEVEL=DEBUG and records
+# are written by a background listener thread
+log_handlers = [
+    logging.FileHandler('test_debug.log', delay=True),
+    logging.StreamHandler()
+]
+for handler in log_handlers:
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, *log_handlers)
+log_listener.start()
+atexit.register(log_listener.stop)
 logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('test_debug.log'),
-        logging.StreamHandler()
-    ]
+    level=getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO),
+    format='%(message)s',
+    handlers=[QueueHandler(log_queue)]
 )
 logger = logging.getLogger(__name__)
 
+@functools.lru_cache(maxsize=8)
+def read_output(path: str) -> str:
+    """Read a generated file once; the tests only read what test_design_analysis wrote"""
+    return Path(path).read_text()
+
 async def test_design_analysis():
     """Test design analysis tool"""
+    # The tests import mcp_client on first use, so importing this module does
+    # not load the MCP SDK
+    from mcp_client import generate_verilog_design
+    
     description = """
     Create a 4-bit ALU with the following specifications:
     - Clock input (clk)
@@ -45,8 +58,10 @@ async def test_design_analysis():
 
 async def test_syntax_analysis():
     """Test syntax analysis tool"""
+    from mcp_client import analyze_syntax
+    
     # Read the generated ALU code
-    alu_code = Path("test_output/alu_4bit.v").read_text()
+    alu_code = read_output("test_output/alu_4bit.v")
     
     try:
         result = await analyze_syntax(alu_code)
@@ -58,9 +73,11 @@ async def test_syntax_analysis():
 
 async def test_simulation_analysis():
     """Test simulation analysis tool"""
+    from mcp_client import analyze_simulation
+    
     # Read the generated ALU code and testbench
-    alu_code = Path("test_output/alu_4bit.v").read_text()
-    testbench = Path("test_output/alu_4bit_tb.sv").read_text()
+    alu_code = read_output("test_output/alu_4bit.v")
+    testbench = read_output("test_output/alu_4bit_tb.sv")
     
     try:
         result = await analyze_simulation(alu_code, testbench)
@@ -72,8 +89,10 @@ async def test_simulation_analysis():
 
 async def test_synthesis_analysis():
     """Test synthesis analysis tool"""
+    from mcp_client import analyze_synthesis
+    
     # Read the generated ALU code
-    alu_code = Path("test_output/alu_4bit.v").read_text()
+    alu_code = read_output("test_output/alu_4bit.v")
     
     try:
         result = await analyze_synthesis(alu_code)
@@ -85,8 +104,10 @@ async def test_synthesis_analysis():
 
 async def test_formal_verification():
     """Test formal verification analysis tool"""
+    from mcp_client import analyze_formal_verification
+    
     # Read the generated ALU code
-    alu_code = Path("test_output/alu_4bit.v").read_text()
+    alu_code = read_output("test_output/alu_4bit.v")
     
     try:
         result = await analyze_formal_verification(alu_code)
@@ -98,8 +119,10 @@ async def test_formal_verification():
 
 async def test_debugging():
     """Test debugging tool"""
+    from mcp_client import debug_design
+    
     # Read the generated ALU code
-    alu_code = Path("test_output/alu_4bit.v").read_text()
+    alu_code = read_output("test_output/alu_4bit.v")
     error_msg = "Setup time violation in ALU module"
     context = "The error occurs during synthesis with a 100MHz clock constraint"
     
@@ -113,8 +136,10 @@ async def test_debugging():
 
 async def test_optimization():
     """Test optimization tool"""
+    from mcp_client import optimize_design
+    
     # Read the generated ALU code
-    alu_code = Path("test_output/alu_4bit.v").read_text()
+    alu_code = read_output("test_output/alu_4bit.v")
     
     try:
         result = await optimize_design(alu_code, "power")
@@ -124,54 +149,72 @@ async def test_optimization():
         logger.error(f"Optimization test failed: {str(e)}")
         raise
 
+async def run_until_first_failure(*coros):
+    """Run tests concurrently and return their results in order.
+    
+    Unlike gather, the first failure cancels the tests still running, so a
+    broken design or server stops further tool calls instead of letting each
+    sibling fail on its own.
+    """
+    tasks = [asyncio.create_task(coro) for coro in coros]
+    done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    for task in done:
+        if task.exception() is not None:
+            raise task.exception()
+    return [task.result() for task in tasks]
+
 async def run_all_tests():
     """Run all MCP tool tests"""
     logger.info("Starting MCP tool tests...")
     
-    try:
-        # Test design analysis
-        logger.info("Testing design analysis...")
-        design_result = await test_design_analysis()
-        
-        # Test syntax analysis
-        logger.info("Testing syntax analysis...")
-        syntax_result = await test_syntax_analysis()
-        
-        # Test simulation analysis
-        logger.info("Testing simulation analysis...")
-        simulation_result = await test_simulation_analysis()
-        
-        # Test synthesis analysis
-        logger.info("Testing synthesis analysis...")
-        synthesis_result = await test_synthesis_analysis()
-        
-        # Test formal verification
-        logger.info("Testing formal verification...")
-        formal_result = await test_formal_verification()
-        
-        # Test debugging
-        logger.info("Testing debugging...")
-        debug_result = await test_debugging()
-        
-        # Test optimization
-        logger.info("Testing optimization...")
-        opt_result = await test_optimization()
-        
-        logger.info("All MCP tool tests completed successfully!")
-        
-        return {
-            "design": design_result,
-            "syntax": syntax_result,
-            "simulation": simulation_result,
-            "synthesis": synthesis_result,
-            "formal": formal_result,
-            "debug": debug_result,
-            "optimization": opt_result
-        }
-        
-    except Exception as e:
-        logger.error(f"Test suite failed: {str(e)}")
-        raise
+    # Both servers are spawned here, before the tests fan out, and shut down by
+    # this task when the block exits, whether or not the tests pass
+    from mcp_client import mcp_sessions
+    
+    async with mcp_sessions():
+        try:
+            # Test design analysis
+            logger.info("Testing design analysis...")
+            design_result = await test_design_analysis()
+            
+            # The analysis tests only read the generated design, so they run
+            # concurrently over the shared sessions
+            logger.info("Testing syntax, simulation, synthesis, formal verification, debugging and optimization...")
+            (
+                syntax_result,
+                simulation_result,
+                synthesis_result,
+                formal_result,
+                debug_result,
+                opt_result
+            ) = await run_until_first_failure(
+                test_syntax_analysis(),
+                test_simulation_analysis(),
+                test_synthesis_analysis(),
+                test_formal_verification(),
+                test_debugging(),
+                test_optimization()
+            )
+            
+            logger.info("All MCP tool tests completed successfully!")
+            
+            return {
+                "design": design_result,
+                "syntax": syntax_result,
+                "simulation": simulation_result,
+                "synthesis": synthesis_result,
+                "formal": formal_result,
+                "debug": debug_result,
+                "optimization": opt_result
+            }
+            
+        except Exception as e:
+            logger.error(f"Test suite failed: {str(e)}")
+            raise
 
 if __name__ == "__main__":
     asyncio.run(run_all_tests()) 
\ No newline at end of file
@@ -1,129 +1,166 @@
 import asyncio
+import atexit
 import httpx
 import json
 import logging
 import os
+import queue
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
+from typing import Any, Dict
 
-# Configure logging
+# orjson is optional; fall back to the standard library when it is missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Configure logging; records are written by a background listener thread
+log_handlers = [
+    logging.FileHandler('test_risc_debug.log', delay=True),
+    logging.StreamHandler()
+]
+for handler in log_handlers:
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, *log_handlers)
+log_listener.start()
+atexit.register(log_listener.stop)
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('test_risc_debug.log'),
-        logging.StreamHandler()
-    ]
+    format='%(message)s',
+    handlers=[QueueHandler(log_queue)]
 )
 logger = logging.getLogger(__name__)
 
-# Create output directory if it doesn't exist
-Path("test_output").mkdir(exist_ok=True)
+def dump_json(obj: Any) -> bytes:
+    """Serialize a request body or report as compact UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+def load_json(data: bytes) -> Any:
+    """Parse a JSON response body"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+async def post_json(client: httpx.AsyncClient, url: str, payload: Any) -> httpx.Response:
+    """POST a body encoded by dump_json instead of httpx's standard-library encoder"""
+    return await client.post(url, content=dump_json(payload), headers={"content-type": "application/json"})
+
+# Design specification, built once at import
+RISC_DESIGN_SPEC = {
+    "description": """
+    32-bit RISC processor core with the following features:
+    - 5-stage pipeline (IF, ID, EX, MEM, WB)
+    - 32 general-purpose registers
+    - Basic instruction set (arithmetic, logic, load/store, branch)
+    - Forwarding unit for data hazard handling
+    - Branch prediction with 2-bit saturating counter
+    - Separate instruction and data caches
+    - Memory management unit with TLB
+    - Interrupt handling capability
+    """
+}
+
+async def run_steps(client: httpx.AsyncClient, design_spec: Dict[str, Any], output_dir: Path) -> Dict[str, Any]:
+    """Run the steps one request at a time, each feeding the next
+    
+    Each result is saved as soon as it arrives, so a failing step keeps the
+    outputs of the steps before it.
+    """
+    # Step 1: Analyze design
+    logger.info("Step 1: Analyzing design requirements...")
+    response = await post_json(
+        client,
+        "/analyze",
+        design_spec
+    )
+    response.raise_for_status()
+    analysis_result = load_json(response.content)
+    (output_dir / "risc_analysis.json").write_bytes(dump_json(analysis_result))
+    logger.info("Design analysis completed and saved")
+    
+    # Step 2: Generate Verilog code
+    logger.info("Step 2: Generating Verilog code...")
+    response = await post_json(
+        client,
+        "/generate",
+        {"design_spec": analysis_result}
+    )
+    response.raise_for_status()
+    verilog_result = load_json(response.content)
+    (output_dir / "risc_core.v").write_text(verilog_result["verilog_code"])
+    logger.info("Verilog code generated and saved")
+    
+    # Step 3: Generate testbench
+    logger.info("Step 3: Generating testbench...")
+    response = await post_json(
+        client,
+        "/testbench",
+        {
+            "module_name": analysis_result["module_name"],
+            "design_spec": analysis_result
+        }
+    )
+    response.raise_for_status()
+    testbench_result = load_json(response.content)
+    (output_dir / "risc_core_tb.sv").write_text(testbench_result["testbench_code"])
+    logger.info("Testbench generated and saved")
+    
+    # Step 4: Optimize design
+    logger.info("Step 4: Optimizing design...")
+    response = await post_json(
+        client,
+        "/optimize",
+        {
+            "verilog_code": verilog_result["verilog_code"],
+            "target": "performance"
+        }
+    )
+    response.raise_for_status()
+    optimize_result = load_json(response.content)
+    (output_dir / "risc_core_opt.v").write_text(optimize_result["optimized_code"])
+    logger.info("Design optimization completed and saved")
+    
+    # Step 5: Verify design
+    logger.info("Step 5: Verifying design...")
+    response = await post_json(
+        client,
+        "/verify",
+        {
+            "verilog_code": optimize_result["optimized_code"],
+            "testbench": testbench_result["testbench_code"]
+        }
+    )
+    response.raise_for_status()
+    verify_result = load_json(response.content)
+    (output_dir / "risc_verification.json").write_bytes(dump_json(verify_result))
+    logger.info("Design verification completed and saved")
+    
+    return {
+        "analyze": analysis_result,
+        "generate": verilog_result,
+        "testbench": testbench_result,
+        "optimize": optimize_result,
+        "verify": verify_result
+    }
 
 async def test_risc_processor():
     """Test the RISC processor design process"""
     logger.info("Testing RISC processor design...")
     
-    # Design specification
-    design_spec = {
-        "description": """
-        32-bit RISC processor core with the following features:
-        - 5-stage pipeline (IF, ID, EX, MEM, WB)
-        - 32 general-purpose registers
-        - Basic instruction set (arithmetic, logic, load/store, branch)
-        - Forwarding unit for data hazard handling
-        - Branch prediction with 2-bit saturating counter
-        - Separate instruction and data caches
-        - Memory management unit with TLB
-        - Interrupt handling capability
-        """
-    }
-    
     try:
-        # Step 1: Analyze design
-        logger.info("Step 1: Analyzing design requirements...")
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "http://localhost:9000/analyze",
-                json=design_spec
-            )
-            response.raise_for_status()
-            analysis_result = response.json()
-            
-            # Save analysis results
-            with open("test_output/risc_analysis.json", "w") as f:
-                json.dump(analysis_result, f, indent=2)
-            logger.info("Design analysis completed and saved")
-            
-        # Step 2: Generate Verilog code
-        logger.info("Step 2: Generating Verilog code...")
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "http://localhost:9000/generate",
-                json={"design_spec": analysis_result}
-            )
-            response.raise_for_status()
-            verilog_result = response.json()
-            
-            # Save Verilog code
-            with open("test_output/risc_core.v", "w") as f:
-                f.write(verilog_result["verilog_code"])
-            logger.info("Verilog code generated and saved")
-            
-        # Step 3: Generate testbench
-        logger.info("Step 3: Generating testbench...")
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "http://localhost:9000/testbench",
-                json={
-                    "module_name": analysis_result["module_name"],
-                    "design_spec": analysis_result
-                }
-            )
-            response.raise_for_status()
-            testbench_result = response.json()
-            
-            # Save testbench
-            with open("test_output/risc_core_tb.sv", "w") as f:
-                f.write(testbench_result["testbench_code"])
-            logger.info("Testbench generated and saved")
-            
-        # Step 4: Optimize design
-        logger.info("Step 4: Optimizing design...")
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "http://localhost:9000/optimize",
-                json={
-                    "verilog_code": verilog_result["verilog_code"],
-                    "target": "performance"
-                }
-            )
-            response.raise_for_status()
-            optimize_result = response.json()
-            
-            # Save optimized code
-            with open("test_output/risc_core_opt.v", "w") as f:
-                f.write(optimize_result["optimized_code"])
-            logger.info("Design optimization completed and saved")
-            
-        # Step 5: Verify design
-        logger.info("Step 5: Verifying design...")
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "http://localhost:9000/verify",
-                json={
-                    "verilog_code": optimize_result["optimized_code"],
-                    "testbench": testbench_result["testbench_code"]
-                }
-            )
-            response.raise_for_status()
-            verify_result = response.json()
-            
-            # Save verification results
-            with open("test_output/risc_verification.json", "w") as f:
-                json.dump(verify_result, f, indent=2)
-            logger.info("Design verification completed and saved")
-            
+        # Create output directory if it doesn't exist
+        output_dir = Path("test_output")
+        output_dir.mkdir(exist_ok=True)
+        
+        # One client for every request, so the connection to the server is reused
+        async with httpx.AsyncClient(base_url="http://localhost:9000", timeout=120.0) as client:
+            await run_steps(client, RISC_DESIGN_SPEC, output_dir)
+        
         logger.info("RISC processor design process completed successfully")
         return True
         
@@ -132,4 +169,4 @@ async def test_risc_processor():
         return False
 
 if __name__ == "__main__":
-    asyncio.run(test_risc_processor()) 
\ No newline at end of file
+    asyncio.run(test_risc_processor())
\ No newline at end of file
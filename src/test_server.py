@@ -1,10 +1,17 @@
-import requests
+import asyncio
+import httpx
 
-try:
-    response = requests.post('http://localhost:9000/analyze', json={'description': 'test'})
-    print(f"Status Code: {response.status_code}")
-    print(f"Response: {response.text}")
-except requests.exceptions.ConnectionError:
-    print("Error: Could not connect to the server. Make sure it's running on port 9000.")
-except Exception as e:
-    print(f"Error: {str(e)}") 
\ No newline at end of file
+async def main():
+    """Send one analysis request to the server and print the response"""
+    try:
+        async with httpx.AsyncClient() as client:
+            response = await client.post('http://localhost:9000/analyze', json={'description': 'test'})
+        print(f"Status Code: {response.status_code}")
+        print(f"Response: {response.text}")
+    except httpx.ConnectError:
+        print("Error: Could not connect to the server. Make sure it's running on port 9000.")
+    except Exception as e:
+        print(f"Error: {str(e)}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,10 +3,12 @@ Pytest configuration for MCP Verilog tests
 """
 
 import pytest
+import pytest_asyncio
 import asyncio
+import httpx
 import logging
 from pathlib import Path
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
 # Configure logging for tests
 logging.basicConfig(
@@ -17,26 +19,26 @@ logging.basicConfig(
 @pytest.fixture(scope="session")
 def event_loop() -> Generator[asyncio.AbstractEventLoop, None, None]:
     """Create an event loop for the test session"""
+    # Every async test in the session runs on this one loop; the test scripts'
+    # asyncio.run guards only start a loop when a file is run on its own
     loop = asyncio.get_event_loop_policy().new_event_loop()
     yield loop
     loop.close()
 
+@pytest_asyncio.fixture(scope="session")
+async def http_client() -> AsyncGenerator[httpx.AsyncClient, None]:
+    """HTTP client shared by the integration tests, so they reuse one connection pool"""
+    async with httpx.AsyncClient() as client:
+        yield client
+
 @pytest.fixture(scope="session")
 def test_dir() -> Path:
     """Get the test directory path"""
     return Path(__file__).parent
 
 @pytest.fixture(scope="session")
-def output_dir(test_dir: Path) -> Path:
+def output_dir(tmp_path_factory: pytest.TempPathFactory) -> Path:
     """Create and return the test output directory"""
-    output_dir = test_dir / "test_output"
-    output_dir.mkdir(exist_ok=True)
-    yield output_dir
-    # Clean up test output after tests
-    for item in output_dir.glob("*"):
-        if item.is_file():
-            item.unlink()
-        elif item.is_dir():
-            for subitem in item.glob("*"):
-                subitem.unlink()
-            item.rmdir() 
\ No newline at end of file
+    # Created once per session under pytest's temporary root, which pytest
+    # prunes itself; parallel workers each get their own directory
+    return tmp_path_factory.mktemp("test_output") 
\ No newline at end of file
@@ -1,17 +1,29 @@
 import asyncio
+import atexit
 import httpx
 import json
 import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
-# Configure logging
+# Configure logging; DEBUG output is opt-in via LOG_LEVEL=DEBUG and records
+# are written by a background listener thread
+log_handlers = [
+    logging.FileHandler('logs/test_integration.log', delay=True),
+    logging.StreamHandler()
+]
+for handler in log_handlers:
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, *log_handlers)
+log_listener.start()
+atexit.register(log_listener.stop)
 logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/test_integration.log'),
-        logging.StreamHandler()
-    ]
+    level=getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO),
+    format='%(message)s',
+    handlers=[QueueHandler(log_queue)]
 )
 logger = logging.getLogger(__name__)
 
@@ -21,18 +33,17 @@ TEST_CONFIG = {
     'timeout': 30
 }
 
-async def test_server_connection():
+async def test_server_connection(http_client: httpx.AsyncClient):
     """Test basic server connectivity"""
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(f"{TEST_CONFIG['server_url']}/health")
-            assert response.status_code == 200
-            logger.info("Server connection test passed")
-        except Exception as e:
-            logger.error(f"Server connection test failed: {str(e)}")
-            raise
+    try:
+        response = await http_client.get(f"{TEST_CONFIG['server_url']}/health")
+        assert response.status_code == 200
+        logger.info("Server connection test passed")
+    except Exception as e:
+        logger.error(f"Server connection test failed: {str(e)}")
+        raise
 
-async def test_verilog_generation():
+async def test_verilog_generation(http_client: httpx.AsyncClient):
     """Test Verilog code generation through the API"""
     test_data = {
         "module_name": "test_module",
@@ -43,22 +54,21 @@ async def test_verilog_generation():
         ]
     }
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{TEST_CONFIG['server_url']}/generate",
-                json=test_data,
-                timeout=TEST_CONFIG['timeout']
-            )
-            assert response.status_code == 200
-            result = response.json()
-            assert "verilog_code" in result
-            logger.info("Verilog generation test passed")
-        except Exception as e:
-            logger.error(f"Verilog generation test failed: {str(e)}")
-            raise
+    try:
+        response = await http_client.post(
+            f"{TEST_CONFIG['server_url']}/generate",
+            json=test_data,
+            timeout=TEST_CONFIG['timeout']
+        )
+        assert response.status_code == 200
+        result = response.json()
+        assert "verilog_code" in result
+        logger.info("Verilog generation test passed")
+    except Exception as e:
+        logger.error(f"Verilog generation test failed: {str(e)}")
+        raise
 
-async def test_design_optimization():
+async def test_design_optimization(http_client: httpx.AsyncClient):
     """Test design optimization through the API"""
     test_data = {
         "verilog_code": """
@@ -77,20 +87,19 @@ async def test_design_optimization():
         """
     }
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{TEST_CONFIG['server_url']}/optimize",
-                json=test_data,
-                timeout=TEST_CONFIG['timeout']
-            )
-            assert response.status_code == 200
-            result = response.json()
-            assert "optimized_code" in result
-            logger.info("Design optimization test passed")
-        except Exception as e:
-            logger.error(f"Design optimization test failed: {str(e)}")
-            raise
+    try:
+        response = await http_client.post(
+            f"{TEST_CONFIG['server_url']}/optimize",
+            json=test_data,
+            timeout=TEST_CONFIG['timeout']
+        )
+        assert response.status_code == 200
+        result = response.json()
+        assert "optimized_code" in result
+        logger.info("Design optimization test passed")
+    except Exception as e:
+        logger.error(f"Design optimization test failed: {str(e)}")
+        raise
 
 async def main():
     """Run all integration tests"""
@@ -100,12 +109,15 @@ async def main():
         test_design_optimization
     ]
     
-    for test in tests:
-        try:
-            await test()
-        except Exception as e:
-            logger.error(f"Test {test.__name__} failed: {str(e)}")
-            raise
+    # The tests share no state, so they run concurrently over one connection pool
+    async with httpx.AsyncClient() as client:
+        results = await asyncio.gather(*(test(client) for test in tests), return_exceptions=True)
+    
+    failures = [(test, result) for test, result in zip(tests, results) if isinstance(result, Exception)]
+    for test, error in failures:
+        logger.error(f"Test {test.__name__} failed: {str(error)}")
+    if failures:
+        raise failures[0][1]
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
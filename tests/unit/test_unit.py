@@ -5,15 +5,18 @@ Test script for Verilog Generator with complex design examples
 
 import asyncio
 import logging
+import os
+import re
 from pathlib import Path
 import pytest
 from mcp_verilog.tools.verilog_generator import VerilogGenerator
 from mcp_verilog.tools.design_optimizer import DesignOptimizer
 from mcp_verilog.tools.design_verifier import DesignVerifier
+from mcp_verilog.tools.verilog_scan import ToolContext, scan_probes
 
-# Configure logging
+# Configure logging; DEBUG output is opt-in via LOG_LEVEL=DEBUG
 logging.basicConfig(
-    level=logging.DEBUG,
+    level=getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
         logging.FileHandler('logs/test_unit.log'),
@@ -97,5 +100,61 @@ def test_design_verifier_basic(design_verifier):
     assert "syntax_check" in verification_result
     assert "timing_check" in verification_result
 
+def test_scan_probes_basic():
+    """Test single-scan probe results"""
+    test_code = """
+    reg [7:0] a;
+    reg [7:0] b;
+    always @(posedge clk) a <= b;
+    """
+    probes = {
+        "reg": re.compile(r'reg\s+\[.*?\]'),
+        "clk": re.compile(r'posedge\s+clk'),
+        "rst": re.compile(r'negedge\s+rst')
+    }
+    
+    results = scan_probes(test_code, probes, counted=("reg",))
+    assert results == {"reg": 2, "clk": 1, "rst": 0}
+    assert scan_probes(test_code, probes, counted={"reg": 1})["reg"] == 1
+
+def test_tool_context_scan_once():
+    """Test that a shared context scans each probe table once"""
+    ctx = ToolContext(verilog_file=Path("design.v"), testbench_file=None, verilog_content="reg [3:0] a;")
+    probes = {"reg": re.compile(r'reg\s+\[.*?\]')}
+    
+    first = ctx.scan("regs", "verilog", probes, counted=("reg",))
+    assert first == {"reg": 1}
+    assert ctx.scan("regs", "verilog", probes) is first
+
+def test_design_verifier_property_coverage():
+    """Test that property presence and count come from the same scan"""
+    verilog_code = """
+    property p_reset;
+    property p_valid;
+    assume stable_inputs;
+    """
+    ctx = ToolContext("design.v", "design_tb.sv", verilog_content=verilog_code, testbench_content="")
+    verifier = DesignVerifier("design.v", "design_tb.sv", ctx=ctx)
+    
+    result = verifier.verify_formal_properties()
+    assert result.coverage == 40.0
+    assert "No formal properties defined" not in result.issues
+
+def test_design_verifier_generators_reuse_scan():
+    """Test that assertion and coverage generation reuse the verification scan"""
+    verilog_code = """
+    input reset;
+    always @(posedge clk) state <= next_state;
+    """
+    ctx = ToolContext("design.v", "design_tb.sv", verilog_content=verilog_code, testbench_content="")
+    verifier = DesignVerifier("design.v", "design_tb.sv", ctx=ctx)
+    
+    verifier.verify_all()
+    scan = ctx.scans["verifier_verilog"]
+    assert "reset_assertion" in verifier.generate_assertions()
+    assert "state_coverage" in verifier.generate_coverage_model()
+    assert "data_coverage" not in verifier.generate_coverage_model()
+    assert ctx.scans["verifier_verilog"] is scan
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"]) 
\ No newline at end of file